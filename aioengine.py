@@ -0,0 +1,183 @@
+##################################
+# COSC264 Sockets Assignment 2018 - aioengine.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# The asyncio engine of server.py, kept in its own module as asyncio is slow
+# to import and the select engine doesn't need it. The functions are passed
+# the server module so they use the state of the running server.
+##################################
+
+
+# Importing used modules
+import asyncio
+import signal
+import time
+try:
+    # uvloop is optional, it is used by the asyncio engine when installed
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+class DateTimeProtocol(asyncio.DatagramProtocol):
+    """
+    Answers the requests received on one of the server's ports when the
+    server is run on an asyncio event loop
+    """
+
+    def __init__(self, server, lang_code, zone=0):
+        """
+        Creates the protocol for a port
+        :param server: The server module
+        :param lang_code: The language of the port the protocol answers on
+        :param zone: The index of the time zone of the port
+        """
+        self.server = server
+        self.lang_code = lang_code
+        self.zone = zone
+        self.transport = None
+
+    def connection_made(self, transport):
+        """
+        Keeps the transport used to send responses
+        :param transport: The datagram transport of the port
+        """
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        """
+        Answers a request packet received on the port
+        :param data: The received packet
+        :param address: The address the packet was received from
+        """
+        server = self.server
+        response = server.answer_request(data, address, self.lang_code, self.zone)
+        if server.capture:
+            server.capture.write(time.time(), self.lang_code, address, data, response)
+        if response:
+            self.transport.sendto(response, address)
+            server.log.debug("Response packet sent to %s: %s", address, response)
+
+    def error_received(self, exc):
+        """
+        Counts a response that couldn't be sent
+        :param exc: The error raised by the send
+        """
+        self.server.stats.send_errors += 1
+        self.server.log.warning("Sending response failed: %s", exc)
+
+
+async def start_async_server(server, sockets):
+    """
+    Starts answering requests on the server's sockets from the running event loop
+    :param server: The server module
+    :param sockets: List holding the UDP sockets used by the server
+    :return: A list of the datagram transports, closing them stops the server
+    """
+    loop = asyncio.get_running_loop()
+    transports = []
+    for sock in sockets:
+        lang_code = server.get_lang(sock, sockets)
+        zone = server.socket_zones[sock.fileno()]
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda lang_code=lang_code, zone=zone: DateTimeProtocol(server, lang_code, zone), sock=sock)
+        transports.append(transport)
+    return transports
+
+
+async def serve_async(server, sockets):
+    """
+    Serves requests on the server's sockets until SIGTERM is received, the
+    socket is handed over or the task is cancelled. The requests queued on
+    the sockets are answered before it returns, unless it was cancelled.
+    SIGHUP reloads the server's configuration.
+    :param server: The server module
+    :param sockets: List holding the UDP sockets used by the server
+    """
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    transports = await start_async_server(server, sockets)
+
+    def stop():
+        if not stopped.done():
+            stopped.set_result(None)
+
+    def reload():
+        server.reload_config()
+        # The protocols take the language their socket has in the new catalogue
+        for transport in transports:
+            protocol = transport.get_protocol()
+            protocol.lang_code = server.socket_languages[transport.get_extra_info("socket").fileno()]
+
+    def offer():
+        conn = server.offer_sockets(sockets)
+        if conn:
+            # No other server is let in until this one replies
+            loop.remove_reader(listener.fileno())
+            loop.add_reader(conn.fileno(), reply, conn.fileno())
+
+    def reply(fd):
+        accepted = server.hand_over()
+        if accepted is None:
+            return
+        loop.remove_reader(fd)
+        if accepted:
+            stop()
+        else:
+            loop.add_reader(listener.fileno(), offer)
+
+    signals = []
+    try:
+        for signum, handler in ((signal.SIGTERM, stop), (signal.SIGHUP, reload)):
+            loop.add_signal_handler(signum, handler)
+            signals.append(signum)
+    except (NotImplementedError, RuntimeError, ValueError):
+        # Signals can only be handled by a loop in the main thread
+        pass
+    listener = server.handoff_listener
+    if listener:
+        loop.add_reader(listener.fileno(), offer)
+    if server.stop_requested:
+        stop()
+    try:
+        await stopped
+        # Answering the requests still queued on the sockets before the
+        # transports close them, as the select engine does
+        batch = server.running_options["--batch"] if server.running_options else 1
+        server.drain(sockets, server.make_buffers(batch))
+    finally:
+        if listener:
+            loop.remove_reader(listener.fileno())
+            if listener.conn:
+                loop.remove_reader(listener.conn.fileno())
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        for transport in transports:
+            transport.close()
+
+
+def wait_async(server, sockets):
+    """
+    Server runs an asyncio event loop answering requests from the client,
+    the loop is provided by uvloop when it is installed
+    :param server: The server module
+    :param sockets: List holding the UDP sockets used by the server
+    """
+    if uvloop:
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(serve_async(server, sockets))
+    finally:
+        loop.close()
+
+
+##################################
+# End of aioengine.py file
+##################################
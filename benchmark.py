@@ -0,0 +1,173 @@
+##################################
+# COSC264 Sockets Assignment 2018 - benchmark.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Usage:
+# python3 benchmark.py [--output FILE] [--compare FILE] [--tolerance T]
+# Options:
+#   --output FILE   File the JSON results are written to (default stdout)
+#   --compare FILE  Earlier results that the new results are checked against
+#   --tolerance T   Fraction a benchmark may slow down by before it is
+#                   reported as a regression (default 0.25)
+##################################
+
+
+# Importing used modules
+import json
+import socket as soc
+import sys
+import threading
+import time
+import timeit
+import client
+import server
+from clock import FakeClock
+from languages import DEFAULT_CATALOGUE
+from protocol import DATE_REQUEST, TIME_REQUEST, ENGLISH_CODE, pack_request
+
+
+# Defining the options along with their default values
+DEFAULT_OPTIONS = {"--output": "", "--compare": "", "--tolerance": 0.25}
+USAGE = "Usage: python3 benchmark.py [--output FILE] [--compare FILE] [--tolerance T]"
+# Number of times each microbenchmark is run in one repeat, the best repeat is kept
+NUMBER = 20000
+REPEAT = 5
+# Number of requests sent to the in-process server in the round trip benchmark
+ROUND_TRIPS = 2000
+
+
+def process_options(args):
+    """
+    Processing the command line arguments
+    :param args: The command line arguments
+    :return: A dictionary holding the value of every option
+    """
+    text = None
+    options = dict(DEFAULT_OPTIONS)
+    if len(args) % 2 != 0:
+        text = "Invalid number of inputs"
+    for index in range(0, len(args) - 1, 2):
+        if args[index] not in DEFAULT_OPTIONS:
+            text = "Unknown option {0}".format(args[index])
+            break
+        try:
+            options[args[index]] = type(DEFAULT_OPTIONS[args[index]])(args[index + 1])
+        except ValueError:
+            text = "Invalid value for option {0}".format(args[index])
+    if text:
+        print("*****************************")
+        print(text)
+        print("*****************************")
+        print(USAGE)
+        print("Program will now exit")
+        sys.exit()
+    return options
+
+
+def time_function(function, *args):
+    """
+    Times a function over several repeats
+    :param function: The function to time
+    :param args: The arguments the function is called with
+    :return: The best time of a single call in microseconds
+    """
+    timer = timeit.Timer(lambda: function(*args))
+    return min(timer.repeat(repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+
+def start_server():
+    """
+    Runs the server on localhost in a background thread
+    :return: The ports the server's sockets are bound to
+    """
+    sockets = server.create_sockets([0] * len(server.LANGUAGE_LIST))
+    thread = threading.Thread(target=server.wait, args=(sockets,), daemon=True)
+    thread.start()
+    return [sock.getsockname()[1] for sock in sockets]
+
+
+def time_round_trips(ports):
+    """
+    Sends requests to the in-process server one at a time
+    :param ports: The ports of the server
+    :return: The mean round trip time in microseconds
+    """
+    sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    sock.settimeout(1.0)
+    request = pack_request(TIME_REQUEST)
+    start = time.perf_counter()
+    for i in range(ROUND_TRIPS):
+        sock.sendto(request, ("127.0.0.1", ports[i % len(ports)]))
+        sock.recvfrom(client.BUFFER_SIZE)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return elapsed / ROUND_TRIPS * 1e6
+
+
+def run_benchmarks():
+    """
+    Runs every benchmark
+    :return: A dictionary of the time taken by each benchmark in microseconds
+    """
+    # Stopping the clock so no run pays for rebuilding the cache at a minute boundary
+    server.set_clock(FakeClock(time.time()))
+    request = pack_request(DATE_REQUEST)
+    response = server.make_response(True, ENGLISH_CODE)
+    results = {
+        "make_response": time_function(server.make_response, True, ENGLISH_CODE),
+        "decode_packet": time_function(server.decode_packet, request),
+        "validate_packet": time_function(client.validate_packet, response),
+        "round_trip": time_round_trips(start_server()),
+    }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Finds the benchmarks that are slower than in earlier results
+    :param results: The new results
+    :param baseline: The earlier results
+    :param tolerance: Fraction a benchmark may slow down by
+    :return: A list of the names of the benchmarks that regressed
+    """
+    regressions = []
+    for name, value in results.items():
+        if name in baseline and value > baseline[name] * (1.0 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmarks and outputs the results
+    """
+    options = process_options(sys.argv[1:])
+    server.load_languages(DEFAULT_CATALOGUE)
+    results = run_benchmarks()
+    text = json.dumps(results, indent=2)
+    if options["--output"]:
+        with open(options["--output"], "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    if options["--compare"]:
+        with open(options["--compare"]) as baseline:
+            regressions = compare(results, json.load(baseline), options["--tolerance"])
+        if regressions:
+            print("*****************************")
+            print("Performance regressions found in: {0}".format(", ".join(regressions)))
+            print("*****************************")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+##################################
+# End of benchmark.py file
+##################################
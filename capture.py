@@ -0,0 +1,179 @@
+##################################
+# COSC264 Sockets Assignment 2018 - capture.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Binary capture log of the datagrams received by server.py, read back by
+# replay.py
+##################################
+
+
+# Importing used modules
+import mmap
+import socket as soc
+import struct
+
+
+# The first bytes of every capture file
+FILE_MAGIC = b"DTCAP\x00\x01\x00"
+# Record header: receive time from time.time(), language code of the port,
+# address family (4 or 6), source port, source address padded to 16 bytes,
+# length of the request and length of the response, 0 if none was sent.
+# The request and then the response follow the header.
+RECORD_STRUCT = struct.Struct(">dHBH16sHH")
+RECORD_HEADER_LENGTH = RECORD_STRUCT.size
+# Size of the write buffer, records are only written to disk once it is full
+WRITE_BUFFER = 1 << 16
+
+
+class CaptureError(Exception):
+    """
+    Raised when a capture file can't be read
+    """
+
+
+class CaptureRecord:
+    """
+    A datagram read from a capture file, the request and response are views
+    of the mapped file
+    """
+    __slots__ = ("timestamp", "lang_code", "address", "request", "response")
+
+    def __init__(self, timestamp, lang_code, address, request, response):
+        """
+        Creates a record
+        :param timestamp: The time.time() time the datagram was received
+        :param lang_code: The language of the port the datagram was received on
+        :param address: The (host address, port) the datagram was sent from
+        :param request: A memoryview of the received datagram
+        :param response: A memoryview of the response sent, empty if none was sent
+        """
+        self.timestamp = timestamp
+        self.lang_code = lang_code
+        self.address = address
+        self.request = request
+        self.response = response
+
+
+class CaptureWriter:
+    """
+    Appends length prefixed records to a capture file
+    """
+
+    def __init__(self, path):
+        """
+        Creates a capture file, any file already at the path is replaced
+        :param path: The path of the capture file
+        """
+        self.path = path
+        self.file = open(path, "wb", buffering=WRITE_BUFFER)
+        self.file.write(FILE_MAGIC)
+
+    def write(self, timestamp, lang_code, address, request, response):
+        """
+        Adds a datagram to the capture
+        :param timestamp: The time.time() time the datagram was received
+        :param lang_code: The language of the port the datagram was received on
+        :param address: The address the datagram was received from
+        :param request: The received datagram
+        :param response: The response sent to it, None if none was sent
+        """
+        host = address[0]
+        if ":" in host:
+            family, packed = 6, soc.inet_pton(soc.AF_INET6, host.partition("%")[0])
+        else:
+            family, packed = 4, soc.inet_aton(host)
+        if response is None:
+            response = b""
+        self.file.write(RECORD_STRUCT.pack(timestamp, lang_code, family, address[1], packed,
+                                           len(request), len(response)))
+        self.file.write(request)
+        self.file.write(response)
+
+    def close(self):
+        """
+        Writes any buffered records and closes the file
+        """
+        self.file.close()
+
+    def reopen(self):
+        """
+        Closes the file and opens the path again, so a capture file that has
+        been moved away is replaced by a new one. A file still at the path is
+        appended to.
+        """
+        self.file.close()
+        self.file = open(self.path, "ab", buffering=WRITE_BUFFER)
+        if self.file.tell() == 0:
+            self.file.write(FILE_MAGIC)
+
+
+class CaptureReader:
+    """
+    Reads the records of a capture file through a memory map, so the
+    datagrams aren't copied as they are read
+    """
+
+    def __init__(self, path):
+        """
+        Maps a capture file
+        :param path: The path of the capture file
+        """
+        try:
+            with open(path, "rb") as capture:
+                self.map = mmap.mmap(capture.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise CaptureError("Capture file {0} can't be read: {1}".format(path, e))
+        if self.map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            self.map.close()
+            raise CaptureError("{0} isn't a capture file".format(path))
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """
+        Reads every record in the file, in the order they were received
+        :return: A generator of CaptureRecords, the views they hold are only
+        valid until the reader is closed
+        """
+        view = memoryview(self.map)
+        offset = len(FILE_MAGIC)
+        try:
+            while offset < len(view):
+                if offset + RECORD_HEADER_LENGTH > len(view):
+                    raise CaptureError("Capture file {0} ends part way through a record".format(self.path))
+                timestamp, lang_code, family, port, packed, request_length, response_length = \
+                    RECORD_STRUCT.unpack_from(view, offset)
+                offset += RECORD_HEADER_LENGTH
+                if offset + request_length + response_length > len(view):
+                    raise CaptureError("Capture file {0} ends part way through a record".format(self.path))
+                if family == 6:
+                    address = (soc.inet_ntop(soc.AF_INET6, packed), port)
+                else:
+                    address = (soc.inet_ntoa(packed[:4]), port)
+                request = view[offset:offset + request_length]
+                offset += request_length
+                response = view[offset:offset + response_length]
+                offset += response_length
+                yield CaptureRecord(timestamp, lang_code, address, request, response)
+        finally:
+            view.release()
+
+    def close(self):
+        """
+        Unmaps the file
+        """
+        self.map.close()
+
+
+##################################
+# End of capture.py file
+##################################
@@ -8,25 +8,176 @@
 
 ##################################
 # Usage:
-# python3 client.py request host port
+# python3 client.py request host port [options]
+# Where request is date, time or all, all asks for the date and time in
+# every language in one batch request
+# Options:
+#   --retries N      Times the request is resent if no response arrives (default 3)
+#   --hedge H:P      Server a duplicate request is sent to if the first is slow,
+#                    when a host has several addresses the next one is used
+#   --zone N         Index of the server's time zone to answer in (default 0,
+#                    the zone of the port)
+#   --cache FILE     Answers a date or time request from FILE if the same
+#                    request was answered this minute, saving new responses
+#                    to it, the file can be shared by many clients (default off)
+#   --skew S         Seconds the server's clock may be ahead of the client's,
+#                    cached responses expire this long before the minute ends (default 1.0)
+#   --languages FILE Language catalogue the server was started with, responses
+#                    in languages it doesn't hold are rejected (default languages.json)
+# python3 client.py bench host port [port ...] [options]
+# Or imported as a library, see DateTimeClient
+# Bench options:
+#   --rate R         Requests sent per second across all ports (default 1000.0)
+#   --concurrency C  Number of client sockets used (default 8)
+#   --duration D     Seconds spent sending requests (default 10.0)
+#   --output FILE    File the JSON results are written to (default stdout)
+#   --languages FILE Language catalogue the server was started with (default languages.json)
 ##################################
 
 
 # Importing used modules
+import json
+import os
+import random
 import socket as soc
 import sys
+import time
+from collections import deque
 from select import select
+from clock import SYSTEM_CLOCK
+from languages import DEFAULT_CATALOGUE, CatalogueError, load_catalogue
+from protocol import (BATCH_RESPONSE_PACKET, DATE_REQUEST, TIME_REQUEST, ZONE_SHIFT,
+                      RESPONSE_HEADER_LENGTH, BATCH_HEADER_LENGTH, BATCH_STRUCT, MAX_BATCH,
+                      HEADER_LENGTH, MAGIC_BYTES, RESPONSE_HEADER, BATCH_RESPONSE_HEADER,
+                      pack_request, unpack_response, pack_batch_request, unpack_batch_response)
 
 
-# Defining constants
-MAGIC_NUMBER = 0x497E
-REQUEST_PACKET = 0x0001
-RESPONSE_PACKET = 0x0002
-DATE_REQUEST = 0x0001
-TIME_REQUEST = 0x0002
-ENGLISH_CODE = 0x0001
-MAORI_CODE = 0x0002
-GERMAN_CODE = 0x0003
+# The name of each language in the catalogue keyed by its language code,
+# load_languages() replaces them with another catalogue's
+LANGUAGE_NAMES = {language.code: language.name for language in load_catalogue()}
+
+
+# Defining the options of a single request along with their default values
+DEFAULT_OPTIONS = {"--retries": 3, "--hedge": "", "--zone": 0, "--cache": "", "--skew": 1.0,
+                   "--languages": DEFAULT_CATALOGUE}
+# Seconds waited for the first response before any round trip time is known
+INITIAL_TIMEOUT = 0.25
+# Bounds on the time waited for a response, as in TCP's retransmission timeout
+MIN_TIMEOUT = 0.05
+MAX_TIMEOUT = 4.0
+# Fraction the timeout is randomly moved by so retries from clients spread out
+JITTER = 0.1
+# Number of recent round trip times kept to work out when to hedge
+RTT_SAMPLES = 100
+# Fewest round trip times needed before the hedge delay follows the p95
+HEDGE_MIN_SAMPLES = 10
+# Most sockets a DateTimeClient opens, and so most requests it has
+# outstanding to one server address at once
+CLIENT_SOCKETS = 8
+# Seconds the server's clock is allowed to be ahead of the client's, a
+# cached response expires this long before the minute it was made in ends
+DEFAULT_SKEW = DEFAULT_OPTIONS["--skew"]
+# Time zone offsets are whole multiples of this many minutes
+OFFSET_MINUTES = 15
+# Defining the options of the bench mode along with their default values
+DEFAULT_BENCH_OPTIONS = {"--rate": 1000.0, "--concurrency": 8, "--duration": 10.0, "--output": "",
+                         "--languages": DEFAULT_CATALOGUE}
+BENCH_USAGE = "Usage: python3 client.py bench host port [port ...] [options]"
+# Seconds a benchmark request waits for its response before it is counted as lost
+BENCH_TIMEOUT = 1.0
+# Buffer size is 1526 as this is the size of the biggest packet
+# that can be sent over ethernet
+BUFFER_SIZE = 1526
+
+
+def load_languages(path):
+    """
+    Loads the language catalogue the server was started with, so responses
+    in the languages it adds are accepted. The catalogue is shared by every
+    client in the process.
+    :param path: The path of the catalogue file
+    :raises CatalogueError: If the catalogue can't be loaded
+    """
+    languages = load_catalogue(path)
+    LANGUAGE_NAMES.clear()
+    for language in languages:
+        LANGUAGE_NAMES[language.code] = language.name
+
+
+def check_packet(pkt):
+    """
+    Checking that the received response or batch response packet is valid
+    :param pkt: The received response packet
+    :return: None if the packet is valid, otherwise the error found in it
+    """
+    text = None
+    # Checking the header first, junk is rejected here without being unpacked
+    header = bytes(pkt[:HEADER_LENGTH])
+    if header == RESPONSE_HEADER:
+        if len(pkt) < RESPONSE_HEADER_LENGTH: text = "Invalid packet header length"
+        else: text = check_response(unpack_response(pkt))
+    elif header == BATCH_RESPONSE_HEADER:
+        if len(pkt) < BATCH_HEADER_LENGTH: text = "Invalid packet header length"
+        else: text = check_batch(pkt, BATCH_STRUCT.unpack_from(pkt)[2])
+    elif len(pkt) < BATCH_HEADER_LENGTH: text = "Invalid packet header length"
+    elif header[:2] != MAGIC_BYTES: text = "Invalid magic number"
+    else: text = "Invalid packet type"
+    return text
+
+
+def check_batch(pkt, count):
+    """
+    Checking that every record of a batch response packet is valid
+    :param pkt: The received batch response packet
+    :param count: The count field of the packet
+    :return: None if the packet is valid, otherwise the error found in it
+    """
+    if count < 1 or count > MAX_BATCH:
+        return "Invalid batch count"
+    try:
+        responses = unpack_batch_response(pkt)
+    except ValueError as e:
+        return str(e)
+    for index, response in enumerate(responses):
+        text = check_response(response)
+        if text:
+            return "{0} in record {1}".format(text, index + 1)
+    return None
+
+
+def check_response(response):
+    """
+    Checking the fields of a response or of a record of a batch response
+    :param response: The Response to check
+    :return: None if the fields are valid, otherwise the error found in them
+    """
+    text = None
+    if response.lang_code not in LANGUAGE_NAMES: text = "Invalid language code"
+    elif response.year >= 2100 or response.year <= 0: text = "Invalid year"
+    elif response.month < 1 or response.month > 12: text = "Invalid month"
+    elif response.day < 1 or response.day > 31: text = "Invalid day"
+    elif response.hour < 0 or response.hour > 23: text = "Invalid hour"
+    elif response.minute < 0 or response.minute > 59: text = "Invalid minute"
+    elif len(response.text) != response.length: text = "Invalid packet length"
+    else:
+        # The textual field is printed so it must be valid UTF-8
+        try:
+            response.decoded_text()
+        except UnicodeDecodeError:
+            text = "Invalid textual field"
+    return text
+
+
+def unpack_packet(pkt):
+    """
+    Reads a response or batch response packet that has been checked
+    :param pkt: The received packet
+    :return: The Response held by a response packet, or a list of the
+    Responses held by a batch response packet
+    """
+    if BATCH_STRUCT.unpack_from(pkt)[1] == BATCH_RESPONSE_PACKET:
+        return unpack_batch_response(pkt)
+    return unpack_response(pkt)
 
 
 def validate_packet(pkt):
@@ -34,18 +185,7 @@ def validate_packet(pkt):
     Checking that the received response packet is valid
     :param pkt: The received response packet
     """
-    text = None
-    # Checking all fields of the response packet
-    if len(pkt) < 13: text = "Invalid packet header length"
-    elif ((pkt[0] << 8) + pkt[1]) != MAGIC_NUMBER: text = "Invalid magic number"
-    elif ((pkt[2] << 8) + pkt[3]) != RESPONSE_PACKET: text = "Invalid packet type"
-    elif ((pkt[4] << 8) + pkt[5]) not in [ENGLISH_CODE, MAORI_CODE, GERMAN_CODE]: text = "Invalid language code"
-    elif ((pkt[6] << 8) + pkt[7]) >= 2100 or ((pkt[6] << 8) + pkt[7]) <= 0: text = "Invalid year"
-    elif pkt[8] < 1 or pkt[8] > 12: text = "Invalid month"
-    elif pkt[9] < 1 or pkt[9] > 31: text = "Invalid day"
-    elif pkt[10] < 0 or pkt[10] > 23: text = "Invalid hour"
-    elif pkt[11] < 0 or pkt[11] > 59: text = "Invalid minute"
-    elif len(pkt) != (13 + pkt[12]): text = "Invalid packet length"
+    text = check_packet(pkt)
     if text:
         # Outputting an error message as an error was found in the packet
         print("*****************************")
@@ -62,29 +202,28 @@ def handle_packet(pkt):
     """
     # Checking the packet is valid
     validate_packet(pkt)
+    response = unpack_packet(pkt)
+    if isinstance(response, list):
+        handle_batch(response)
+        return
     # Printing the information from the packet
-    if ((pkt[4] << 8) + pkt[5]) == ENGLISH_CODE:
-        lang = "English"
-    elif ((pkt[4] << 8) + pkt[5]) == MAORI_CODE:
-        lang = "Maori"
-    else:
-        lang = "German"
+    lang = LANGUAGE_NAMES[response.lang_code]
     # Printing the contents of the response packet
     print("Response from server:")
     print("-----")
-    print("Magic number: {0}\nPacket type: {1}".format(hex((pkt[0] << 8) + pkt[1]), RESPONSE_PACKET))
-    print("Language code: {0}".format(((pkt[4] << 8) + pkt[5])))
-    print("Year: {0}\nMonth: {1}\nDay: {2}".format(((pkt[6] << 8) + pkt[7]), pkt[8], pkt[9]))
-    print("Hour: {0}\nMinute: {1}".format(pkt[10], pkt[11]))
-    print("Length field: {0}".format(pkt[12]))
+    print("Magic number: {0}\nPacket type: {1}".format(hex(response.magic_number), response.packet_type))
+    print("Language code: {0}".format(response.lang_code))
+    print("Year: {0}\nMonth: {1}\nDay: {2}".format(response.year, response.month, response.day))
+    print("Hour: {0}\nMinute: {1}".format(response.hour, response.minute))
+    print("Length field: {0}".format(response.length))
     print("-----")
     # Getting time and date to output
-    text = pkt[13:]
-    date = "{0}:{1}:{2}".format(((pkt[6] << 8) + pkt[7]), pkt[8], pkt[9])
-    if pkt[11] < 10:
-        time = "{0}:0{1}".format(pkt[10], pkt[11])
+    text = bytes(response.text)
+    date = "{0}:{1}:{2}".format(response.year, response.month, response.day)
+    if response.minute < 10:
+        time = "{0}:0{1}".format(response.hour, response.minute)
     else:
-        time = "{0}:{1}".format(pkt[10], pkt[11])
+        time = "{0}:{1}".format(response.hour, response.minute)
     print("The date is: {0}".format(date))
     print("The time is: {0}".format(time))
     print("Textual representation in {0}: {1}".format(lang, text.decode()))
@@ -97,11 +236,764 @@ def handle_packet(pkt):
     sys.exit()
 
 
+def handle_batch(responses):
+    """
+    Prints the records of a batch response packet and exits
+    :param responses: The Responses held by the batch response packet
+    """
+    print("Batch response from server with {0} records:".format(len(responses)))
+    print("-----")
+    for response in responses:
+        print("{0} {1}:{2}:{3} {4}:{5:02d}: {6}".format(
+            LANGUAGE_NAMES[response.lang_code], response.year, response.month, response.day,
+            response.hour, response.minute, response.decoded_text()))
+    # Exiting the program
+    print("-----------------------------")
+    print("-----------------------------")
+    print("Program will now exit")
+    print("-----------------------------")
+    print("-----------------------------")
+    sys.exit()
+
+
+def open_socket():
+    """
+    Opens a UDP socket that can reach both IPv4 and IPv6 servers, this is a
+    dual-stack IPv6 socket where the platform supports one
+    :return: The socket
+    """
+    if soc.has_dualstack_ipv6():
+        sock = soc.socket(soc.AF_INET6, soc.SOCK_DGRAM)
+        sock.setsockopt(soc.IPPROTO_IPV6, soc.IPV6_V6ONLY, 0)
+        return sock
+    return soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+
+
+def resolve(host, port):
+    """
+    Finds every address of a server. getaddrinfo() sorts the addresses by
+    preference, they are then interleaved by family as Happy Eyeballs does
+    so the second address is of the other family when there is one.
+    :param host: The host name or address of the server
+    :param port: The port of the server
+    :return: A list of the (host address, port) of the server
+    :raises socket.gaierror: If the host can't be resolved
+    """
+    family = soc.AF_UNSPEC if soc.has_dualstack_ipv6() else soc.AF_INET
+    groups = {}
+    for info in soc.getaddrinfo(host, port, family, soc.SOCK_DGRAM):
+        address = info[4][:2]
+        group = groups.setdefault(info[0], [])
+        if address not in group:
+            group.append(address)
+    addresses = []
+    while any(groups.values()):
+        for group in groups.values():
+            if group:
+                addresses.append(group.pop(0))
+    return addresses
+
+
+def wire_address(sock, address):
+    """
+    Gets the address a packet is sent to from a socket, IPv4 addresses are
+    mapped into IPv6 for a dual-stack socket
+    :param sock: The socket the packet is sent from
+    :param address: The (host address, port) of the server
+    :return: The address to pass to sendto()
+    """
+    if sock.family == soc.AF_INET6 and ":" not in address[0]:
+        return "::ffff:" + address[0], address[1]
+    return address
+
+
+def peer_address(address):
+    """
+    Gets the (host address, port) of a server from the address a packet was
+    received from, undoing the mapping made by wire_address()
+    :param address: The address returned by recvfrom()
+    :return: The (host address, port) of the server
+    """
+    host = address[0]
+    if host.startswith("::ffff:") and "." in host:
+        host = host[7:]
+    return host, address[1]
+
+
+class RttEstimator:
+    """
+    Works out how long to wait for a response from the round trip times seen
+    so far, using the smoothed round trip time and its variance as TCP does
+    """
+
+    def __init__(self):
+        """
+        Creates an estimator that hasn't seen any round trip times
+        """
+        self.srtt = None
+        self.rttvar = None
+        self.samples = deque(maxlen=RTT_SAMPLES)
+
+    def update(self, rtt):
+        """
+        Adds the round trip time of a request that was only sent once
+        :param rtt: The round trip time in seconds
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples.append(rtt)
+
+    def timeout(self, attempt=0):
+        """
+        Works out how long to wait for a response, backing off exponentially
+        with each attempt and adding jitter
+        :param attempt: The number of times the request has already been sent
+        :return: The time to wait in seconds
+        """
+        if self.srtt is None:
+            base = INITIAL_TIMEOUT
+        else:
+            base = self.srtt + 4 * self.rttvar
+        base = min(max(base, MIN_TIMEOUT) * 2 ** attempt, MAX_TIMEOUT)
+        return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def hedge_delay(self):
+        """
+        Works out how long to wait before sending a duplicate request
+        :return: The p95 round trip time, or half the timeout if too few
+        round trip times have been seen
+        """
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return self.timeout() / 2
+        return percentile(sorted(self.samples), 0.95)
+
+
+class ResponseError(Exception):
+    """
+    Raised when a server answers a request with an invalid response packet
+    """
+
+
+class ResponseTimeout(ResponseError):
+    """
+    Raised when a server doesn't answer a request in time
+    """
+
+
+class PendingRequest:
+    """
+    A request sent by a DateTimeClient that may not have been answered yet
+    """
+    __slots__ = ("request_type", "packet", "server", "hedge", "hedge_at", "attempts", "response", "error",
+                 "origin")
+
+    def __init__(self, request_type, server, hedge=None, packet=None):
+        """
+        Creates a request that is waiting for its response
+        :param request_type: If the date or time was requested, None for a
+        batch request
+        :param server: The address the request is sent to
+        :param hedge: The address a duplicate is sent to if the response is
+        slow, or None
+        :param packet: The request packet, made from the request type if None
+        """
+        self.request_type = request_type
+        self.packet = packet if packet is not None else pack_request(request_type)
+        self.server = server
+        self.hedge = hedge
+        self.hedge_at = None
+        self.attempts = 0
+        self.response = None
+        self.error = None
+        # The (host, port) the request was made for, set when its response is cached
+        self.origin = None
+
+    def done(self):
+        """
+        Checks if the request has been answered or has failed
+        :return: True if there is a response or an error
+        """
+        return self.response is not None or self.error is not None
+
+
+def cache_expiry(response, received, skew=DEFAULT_SKEW):
+    """
+    Works out when a response stops being current, which is when the minute
+    it was made in ends on the server. Time zone offsets are whole multiples
+    of 15 minutes, so the minute field of the response differs from the
+    client's UTC minute by a multiple of 15 unless the two clocks are either
+    side of a minute boundary, which shows which of the client's minutes the
+    response was made in.
+    :param response: The Response
+    :param received: The wall clock time the response was received at
+    :param skew: Seconds the server's clock may be ahead of the client's
+    :return: The wall clock time the response expires at
+    """
+    start = received - received % 60
+    step = (response.minute - int(received // 60)) % OFFSET_MINUTES
+    if step == OFFSET_MINUTES - 1:
+        # Server was still in the minute before the client's
+        start -= 60
+    elif step == 1:
+        # Server has already moved on to the client's next minute
+        start += 60
+    elif step != 0:
+        # Minute can't be placed, so the response isn't cached
+        return received
+    return start + 60 - skew
+
+
+class ResponseCache:
+    """
+    Keeps responses until the minute they were made in ends, so a request
+    repeated within the minute is answered without being sent. Responses
+    are keyed by the server they came from and the request type, the port
+    of the server picks the language. Given a path, the responses are also
+    kept in a small JSON file that every client using the path shares.
+    """
+
+    def __init__(self, path=None, skew=DEFAULT_SKEW, clock=SYSTEM_CLOCK):
+        """
+        Creates an empty cache
+        :param path: The path of the file shared with other clients, None to
+        only keep responses in memory
+        :param skew: Seconds the server's clock may be ahead of the client's
+        :param clock: The clock the expiry times are read from
+        """
+        self.path = path
+        self.skew = skew
+        self.clock = clock
+        # The expiry time and response packet of each entry keyed by "host|port|request type"
+        self.entries = {}
+
+    def get(self, server, request_type):
+        """
+        Finds the cached response to a request, the file is read if the
+        response isn't held in memory
+        :param server: The (host, port) of the server
+        :param request_type: The request type of the packet, including its zone
+        :return: The response packet, None if there is no current response
+        """
+        key = "{0}|{1}|{2}".format(server[0], server[1], request_type)
+        now = self.clock.time()
+        entry = self.entries.get(key)
+        if (entry is None or entry[0] <= now) and self.path:
+            self.entries.update(self.load())
+            entry = self.entries.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        return entry[1]
+
+    def put(self, server, request_type, pkt, received=None):
+        """
+        Caches the response to a request until its minute ends
+        :param server: The (host, port) of the server
+        :param request_type: The request type of the packet, including its zone
+        :param pkt: The response packet, already checked
+        :param received: The wall clock time the response was received at,
+        now if None
+        """
+        now = self.clock.time()
+        expires = cache_expiry(unpack_response(pkt), now if received is None else received, self.skew)
+        if expires <= now:
+            return
+        key = "{0}|{1}|{2}".format(server[0], server[1], request_type)
+        self.entries[key] = (expires, bytes(pkt))
+        if self.path:
+            self.save()
+
+    def load(self):
+        """
+        Reads the current responses held in the file, a missing or damaged
+        file holds none as the cache is only an optimisation
+        :return: A dictionary of the entries
+        """
+        try:
+            with open(self.path) as cache_file:
+                stored = json.load(cache_file)
+            now = self.clock.time()
+            entries = {}
+            for key, (expires, packet) in stored.items():
+                packet = bytes.fromhex(packet)
+                # Packets are checked again as the file could have been changed
+                if expires > now and packet[:HEADER_LENGTH] == RESPONSE_HEADER and check_packet(packet) is None:
+                    entries[key] = (expires, packet)
+            return entries
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+    def save(self):
+        """
+        Writes the current responses to the file, adding those saved by other
+        clients since it was read. The file is replaced in one step so other
+        clients never read it part way through being written.
+        """
+        entries = self.load()
+        entries.update(self.entries)
+        now = self.clock.time()
+        stored = {key: [expires, packet.hex()] for key, (expires, packet) in entries.items() if expires > now}
+        temporary = "{0}.{1}.tmp".format(self.path, os.getpid())
+        try:
+            with open(temporary, "w") as cache_file:
+                json.dump(stored, cache_file)
+            os.replace(temporary, self.path)
+        except OSError:
+            # Leaving the response uncached in the file
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+
+class DateTimeClient:
+    """
+    Queries servers for the date and time over a small pool of UDP sockets
+    that are kept open, many requests can be outstanding at once.
+    The protocol has no request id and a response doesn't say if it answers
+    a date or a time request, so responses can't be matched to requests by
+    their order once one is lost. Each socket has at most one request
+    outstanding to each server address, as bench() does, and a response is
+    matched to the request sent from the socket it arrived on to the address
+    that answered it. Requests wait for a free socket when the pool is busy.
+    Requests that aren't answered are resent with exponential backoff, the
+    timeouts follow the round trip times seen from each server.
+    """
+
+    def __init__(self, timeout=None, retries=DEFAULT_OPTIONS["--retries"], cache=None,
+                 sockets=CLIENT_SOCKETS, languages=None):
+        """
+        Creates a client, its sockets are opened as they are needed
+        :param timeout: Seconds the first attempt of a request waits for its
+        response, None to work it out from the round trip times
+        :param retries: Times a request is resent if no response arrives
+        :param cache: The ResponseCache date and time requests are answered
+        from while their minute lasts, None to send every request
+        :param sockets: Most sockets opened, and so most requests outstanding
+        to one server address at once
+        :param languages: The path of the language catalogue the servers were
+        started with, None to keep the catalogue loaded, see load_languages()
+        :raises CatalogueError: If the catalogue can't be loaded
+        """
+        if languages:
+            load_languages(languages)
+        self.timeout = timeout
+        self.retries = retries
+        self.cache = cache
+        self.max_sockets = sockets
+        self.sockets = []
+        # The send outstanding on each (socket, server address), held as
+        # [PendingRequest, time sent, deadline, number of sends unanswered]
+        self.slots = {}
+        # Requests waiting for a socket to be free to send them
+        self.waiting = deque()
+        # The RttEstimator of each server address
+        self.estimators = {}
+        # The addresses of each server keyed by the (host, port) it was given as
+        self.resolved = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the client's sockets, any outstanding requests fail
+        """
+        for pending in [slot[0] for slot in self.slots.values()] + list(self.waiting):
+            if not pending.done():
+                pending.error = ResponseTimeout("Client was closed")
+        self.slots.clear()
+        self.waiting.clear()
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+
+    def estimator(self, server):
+        """
+        Gets the RttEstimator of a server
+        :param server: The address of the server
+        :return: The server's RttEstimator
+        """
+        if server not in self.estimators:
+            self.estimators[server] = RttEstimator()
+        return self.estimators[server]
+
+    def free_socket(self, address):
+        """
+        Finds a socket with no request outstanding to an address, a new
+        socket is opened if every open one is busy and the pool isn't full
+        :param address: The server address
+        :return: The socket, None if every socket is busy
+        """
+        for sock in self.sockets:
+            if (sock, address) not in self.slots:
+                return sock
+        if len(self.sockets) >= self.max_sockets:
+            return None
+        sock = open_socket()
+        sock.setblocking(False)
+        self.sockets.append(sock)
+        return sock
+
+    def transmit(self, pending, address, sock):
+        """
+        Sends a request packet and records when its response is due
+        :param pending: The PendingRequest being sent
+        :param address: The address the packet is sent to
+        :param sock: The socket the packet is sent from, a resent request
+        uses the socket it was first sent from
+        """
+        now = time.monotonic()
+        sock.sendto(pending.packet, wire_address(sock, address))
+        if address == pending.server:
+            if self.timeout is None:
+                timeout = self.estimator(pending.server).timeout(pending.attempts)
+            else:
+                timeout = min(self.timeout * 2 ** pending.attempts, MAX_TIMEOUT)
+            pending.attempts += 1
+        else:
+            # A hedged duplicate is given as long as the request has left
+            timeout = MAX_TIMEOUT
+        slot = self.slots.get((sock, address))
+        if slot is None:
+            self.slots[(sock, address)] = [pending, now, now + timeout, 1]
+        else:
+            # Resent request, a late response to an earlier send still answers it
+            slot[1:] = [now, now + timeout, slot[3] + 1]
+
+    def lookup(self, server):
+        """
+        Picks the address a request to a server is sent to, the server's
+        host is resolved the first time it is used. The address with the
+        lowest smoothed round trip time is used, until one has been seen the
+        next address is raced against the first as Happy Eyeballs does.
+        :param server: The (host, port) of the server, the host can be a name
+        :return: The address to send to and the address raced against it, or None
+        :raises socket.gaierror: If the host can't be resolved
+        """
+        candidates = self.resolved.get(server)
+        if candidates is None:
+            candidates = self.resolved[server] = resolve(*server)
+        measured = [address for address in candidates
+                    if address in self.estimators and self.estimators[address].srtt is not None]
+        if measured:
+            return min(measured, key=lambda address: self.estimators[address].srtt), None
+        return candidates[0], candidates[1] if len(candidates) > 1 else None
+
+    def send(self, request_type, server, hedge=None):
+        """
+        Sends a request without waiting for its response
+        :param request_type: DATE_REQUEST or TIME_REQUEST
+        :param server: The (host, port) of the server
+        :param hedge: The (host address, port) a duplicate is sent to if the
+        response takes longer than the server's p95 round trip time, or None
+        :return: The PendingRequest that will hold the response
+        """
+        if self.cache:
+            packet = self.cache.get(server, request_type)
+            if packet is not None:
+                # Answering from the cache without sending the request
+                pending = PendingRequest(request_type, server)
+                pending.response = unpack_response(packet)
+                return pending
+        address, race = self.lookup(server)
+        pending = PendingRequest(request_type, address, hedge or race)
+        if self.cache:
+            pending.origin = server
+        return self.start(pending)
+
+    def send_batch(self, entries, server, hedge=None):
+        """
+        Sends a batch request without waiting for its response
+        :param entries: A list of (language code, request type) pairs
+        :param server: The (host, port) of the server
+        :param hedge: The (host address, port) a duplicate is sent to if the
+        response is slow, or None
+        :return: The PendingRequest that will hold the list of Responses
+        """
+        address, race = self.lookup(server)
+        return self.start(PendingRequest(None, address, hedge or race, pack_batch_request(entries)))
+
+    def start(self, pending):
+        """
+        Sends a new request, the request waits if every socket has a request
+        outstanding to its server
+        :param pending: The PendingRequest being sent
+        :return: The PendingRequest
+        """
+        sock = None
+        if not any(waiting.server == pending.server for waiting in self.waiting):
+            sock = self.free_socket(pending.server)
+        if sock is None:
+            self.waiting.append(pending)
+        else:
+            self.launch(pending, sock)
+        return pending
+
+    def launch(self, pending, sock):
+        """
+        Sends a request for the first time and schedules its hedged duplicate
+        :param pending: The PendingRequest being sent
+        :param sock: A socket with no request outstanding to the request's server
+        """
+        self.transmit(pending, pending.server, sock)
+        if pending.hedge:
+            pending.hedge_at = time.monotonic() + self.estimator(pending.server).hedge_delay()
+
+    def poll(self, timeout):
+        """
+        Receives the responses that arrive within the timeout and matches them
+        to their requests, requests that have waited too long are resent
+        :param timeout: Most seconds spent waiting for a response
+        """
+        reads, writes, exceps = select(self.sockets, [], [], timeout)
+        for sock in reads:
+            while True:
+                try:
+                    pkt, address = sock.recvfrom(BUFFER_SIZE)
+                except BlockingIOError:
+                    break
+                address = peer_address(address)
+                slot = self.slots.get((sock, address))
+                if slot is None:
+                    # Response to a request that has already failed
+                    continue
+                pending, sent_at, deadline, sends = slot
+                # The socket stays busy until every send to the address is answered
+                slot[3] -= 1
+                if not slot[3]:
+                    del self.slots[(sock, address)]
+                if pending.done():
+                    # Duplicate response to a request that was resent or hedged
+                    continue
+                text = check_packet(pkt)
+                if text:
+                    pending.error = ResponseError(text)
+                    continue
+                response = unpack_packet(pkt)
+                if isinstance(response, list) != (pending.request_type is None):
+                    pending.error = ResponseError("Invalid packet type")
+                    continue
+                pending.response = response
+                if pending.origin and address == pending.server:
+                    # A hedge may be another language's port, so only the
+                    # server the request was made for is cached
+                    self.cache.put(pending.origin, pending.request_type, pkt)
+                if (pending.attempts == 1 and address == pending.server) or address == pending.hedge:
+                    # Round trip times of resent requests are ambiguous so they are
+                    # skipped, a hedge is only sent once so its time is kept
+                    self.estimator(address).update(time.monotonic() - sent_at)
+        self.expire()
+
+    def expire(self):
+        """
+        Resends the requests that have waited longer than their timeout,
+        requests that have used all their retries are failed. A failed
+        request keeps its socket busy a while longer, so a late response
+        isn't taken as the answer to the next request sent from it.
+        """
+        now = time.monotonic()
+        for (sock, address), slot in list(self.slots.items()):
+            pending = slot[0]
+            if slot[2] > now:
+                continue
+            if pending.done() or address != pending.server:
+                del self.slots[(sock, address)]
+            elif pending.attempts <= self.retries:
+                self.transmit(pending, address, sock)
+            else:
+                pending.error = ResponseTimeout("Response too slow")
+                slot[2] = now + MAX_TIMEOUT
+        # Sending the hedged duplicates that are due, a hedge is skipped if
+        # every socket is busy as the request has already been sent
+        for pending in {slot[0] for slot in self.slots.values()}:
+            if pending.hedge_at is not None and pending.hedge_at <= now and not pending.done():
+                pending.hedge_at = None
+                sock = self.free_socket(pending.hedge)
+                if sock:
+                    self.transmit(pending, pending.hedge, sock)
+        # Sending the waiting requests that now have a free socket, in the
+        # order they were made
+        waiting = self.waiting
+        self.waiting = deque()
+        for pending in waiting:
+            sock = self.free_socket(pending.server)
+            if sock is None:
+                self.waiting.append(pending)
+            else:
+                self.launch(pending, sock)
+
+    def next_wake(self, requests):
+        """
+        Finds the next time a deadline or hedge of a waiting request is due
+        :param requests: A list of PendingRequests
+        :return: The time.monotonic() time the client next needs to act
+        """
+        wake = time.monotonic() + MAX_TIMEOUT
+        for slot in self.slots.values():
+            wake = min(wake, slot[2])
+        for pending in requests:
+            if pending.hedge_at is not None and not pending.done():
+                wake = min(wake, pending.hedge_at)
+        return wake
+
+    def wait_for(self, requests):
+        """
+        Waits until every request passed has been answered or has failed
+        :param requests: A list of PendingRequests
+        """
+        while not all(pending.done() for pending in requests):
+            self.poll(max(0.0, self.next_wake(requests) - time.monotonic()))
+
+    def query(self, request_type, server, hedge=None):
+        """
+        Sends a request and waits for its response
+        :param request_type: DATE_REQUEST or TIME_REQUEST
+        :param server: The (host address, port) of the server
+        :param hedge: The (host address, port) a duplicate is sent to if the
+        response is slow, or None
+        :return: The Response from the server
+        """
+        pending = self.send(request_type, server, hedge)
+        self.wait_for([pending])
+        if pending.error:
+            raise pending.error
+        return pending.response
+
+    def query_batch(self, entries, server, hedge=None):
+        """
+        Sends a batch request and waits for its response, the server may
+        answer fewer entries than were asked for if they don't all fit in
+        one datagram
+        :param entries: A list of (language code, request type) pairs
+        :param server: The (host address, port) of the server
+        :param hedge: The (host address, port) a duplicate is sent to if the
+        response is slow, or None
+        :return: A list of the Responses from the server, in the order the
+        entries were given
+        """
+        pending = self.send_batch(entries, server, hedge)
+        self.wait_for([pending])
+        if pending.error:
+            raise pending.error
+        return pending.response
+
+    def query_many(self, queries):
+        """
+        Sends many requests at once and then waits for all of their responses
+        :param queries: A list of (request type, server address) pairs
+        :return: A list holding the Response to each query, or the error if
+        the query failed
+        """
+        requests = [self.send(request_type, server) for request_type, server in queries]
+        self.wait_for(requests)
+        return [pending.response or pending.error for pending in requests]
+
+
+def split_options(args, defaults):
+    """
+    Separates the optional flags from the other command line arguments
+    :param args: The command line arguments
+    :param defaults: A dictionary of every option and its default value
+    :return: A dictionary holding the value of every option, a list of the
+    remaining arguments and an error message if an option is invalid
+    """
+    text = None
+    options = dict(defaults)
+    remaining = []
+    index = 0
+    while index < len(args) and not text:
+        arg = args[index]
+        if not arg.startswith("--"):
+            remaining.append(arg)
+            index += 1
+        elif arg not in defaults:
+            text = "Unknown option {0}".format(arg)
+        elif index + 1 >= len(args):
+            text = "No value given for option {0}".format(arg)
+        else:
+            # Converting the value to the same type as the default value
+            try:
+                options[arg] = type(defaults[arg])(args[index + 1])
+            except ValueError:
+                text = "Invalid value for option {0}".format(arg)
+            index += 2
+    return options, remaining, text
+
+
+def process_address(text):
+    """
+    Processes a server address given as host:port
+    :param text: The address to process
+    :return: The (host address, port) of the server, None if it is invalid
+    """
+    host, sep, port = text.rpartition(":")
+    # IPv6 addresses are given in brackets, as [::1]:5001
+    host = host.strip("[]")
+    try:
+        port = int(port)
+        if not sep or port < 1024 or port > 64000:
+            return None
+        return resolve(host, port)[0]
+    except (ValueError, soc.gaierror):
+        return None
+
+
+def process_languages(path):
+    """
+    Loads the language catalogue given on the command line
+    :param path: The path of the catalogue file
+    :return: None if it was loaded, otherwise the error found in it
+    """
+    try:
+        load_languages(path)
+    except CatalogueError as e:
+        return str(e)
+    return None
+
+
+def process_options(args):
+    """
+    Processing the optional flags of a single request
+    :param args: The command line arguments
+    :return: A dictionary holding the value of every option and a list of
+    the remaining arguments
+    """
+    options, args, text = split_options(args, DEFAULT_OPTIONS)
+    if not text and options["--retries"] < 0:
+        text = "Invalid number of retries, retries can't be negative"
+    elif not text and not 0 <= options["--zone"] <= 255:
+        text = "Invalid time zone, zone must range from 0 to 255"
+    elif not text and not 0 <= options["--skew"] < 30:
+        text = "Invalid clock skew, skew must range from 0 to 30 seconds"
+    elif not text and options["--hedge"]:
+        options["--hedge"] = process_address(options["--hedge"])
+        if not options["--hedge"]:
+            text = "Invalid hedge server, server must be given as host:port"
+    if not text:
+        text = process_languages(options["--languages"])
+    if text:
+        # Outputting an error message as the options are invalid
+        print("*****************************")
+        print(text)
+        print("*****************************")
+        print("Usage: python3 client.py request host port [options]")
+        print("Program will now exit")
+        sys.exit()
+    return options, args
+
+
 def process_inputs(args):
     """
     Processing the command line arguments
     :param args: The command line arguments
-    :return: the request type, host address and port number
+    :return: the request type, port number and a list of the server's addresses
     """
     text = None
     # Getting inputs from command line arguments
@@ -113,16 +1005,19 @@ def process_inputs(args):
         text = "Invalid number of inputs"
     else:
         # Checking if the request field is correct
-        if request_type != "date" and request_type != "time":
-            text = "Invalid request type, request must be either 'date' or 'time'"
+        if request_type not in ("date", "time", "all"):
+            text = "Invalid request type, request must be either 'date', 'time' or 'all'"
             print("*****************************")
             print(text)
             print("*****************************")
         else:
             if request_type == "date":
                 request = DATE_REQUEST
-            else:
+            elif request_type == "time":
                 request = TIME_REQUEST
+            else:
+                # None asks for everything in one batch request
+                request = None
         # Checking if the port field is correct
         try:
             port = int(port)
@@ -138,7 +1033,7 @@ def process_inputs(args):
             print("*****************************")
         # Checking if the host field is correct
         try:
-            host = soc.gethostbyname(host)
+            addresses = [(address, port) for address, unused in resolve(host, None)]
         except soc.gaierror:
             text = "Invalid hostname or IP address"
             print("*****************************")
@@ -152,47 +1047,239 @@ def process_inputs(args):
         sys.exit()
     else:
         # Retuning the processed arguments
-        return request, port, host
+        return request, port, addresses
 
 
-def wait(socket, pkt, server):
+def process_bench_inputs(args):
     """
-    Sending the request packet to the server and then waiting
-    one second for a response
-    :param socket: The clients socket
-    :param pkt: The packet to be sent
-    :param server: The address of the server to send the packet to
+    Processing the command line arguments of the bench mode
+    :param args: The command line arguments following 'bench'
+    :return: A dictionary holding the value of every option, the host
+    address and a list of the port numbers
     """
-    # Sending request packet to the server
-    socket.sendto(pkt, server)
-    print("-----------------------------")
-    print("-----------------------------")
-    print("Request packet sent to {0}: ".format(server))
-    print(pkt)
-    print("-----------------------------")
-    # Waiting for 1 second for response from the server
-    reads, writes, exceps = select([socket], [], [], 1.0)
-    if reads == writes == exceps == []:
-        # Server did not respond fast enough
+    # Separating the options from the host and ports
+    options, remaining, text = split_options(args, DEFAULT_BENCH_OPTIONS)
+    host = None
+    ports = []
+    if text:
+        pass
+    elif len(remaining) < 2:
+        text = "Invalid number of inputs"
+    elif options["--rate"] <= 0 or options["--concurrency"] < 1 or options["--duration"] <= 0:
+        text = "Rate, concurrency and duration must all be greater than 0"
+    else:
+        text = process_languages(options["--languages"])
+    if not text:
+        # Checking the ports and host
+        try:
+            ports = [int(port) for port in remaining[1:]]
+            if any(port < 1024 or port > 64000 for port in ports):
+                text = "Invalid port, port must be in range 1024 to 64000"
+        except ValueError:
+            text = "Invalid port type, port must be an integer"
+        try:
+            host = resolve(remaining[0], None)[0][0]
+        except soc.gaierror:
+            text = "Invalid hostname or IP address"
+    if text:
+        # Outputting an error message as the arguments are invalid
+        # Outputting usage instructions
         print("*****************************")
-        print("Response too slow, program will terminate")
+        print(text)
         print("*****************************")
-        # Closing the socket
-        socket.close()
+        print(BENCH_USAGE)
+        print("Program will now exit")
         sys.exit()
-    elif len(reads) != 0:
-        # Receiving response from the server
-        # Buffer size is 1526 as this is the size of the biggest packet
-        # that can be sent over ethernet
-        pkt, address = socket.recvfrom(1526)
-        # Packet has been received from the server
-        print("Response packet received from {0}: ".format(address))
-        print(pkt)
+    return options, host, ports
+
+
+def percentile(latencies, fraction):
+    """
+    Finds a percentile of a sorted list of latencies
+    :param latencies: The sorted latencies
+    :param fraction: The percentile wanted as a fraction, e.g. 0.99
+    :return: The latency at the percentile, None if there are no latencies
+    """
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+def bench(host, ports, options):
+    """
+    Sends date and time requests to every port at a fixed rate, each socket
+    has at most one request outstanding to each port so every response can
+    be matched to the request it answers
+    :param host: The address of the server
+    :param ports: The ports of the server to send requests to
+    :param options: A dictionary holding the value of every bench option
+    :return: A dictionary holding the results of the benchmark
+    """
+    sockets = []
+    for i in range(options["--concurrency"]):
+        sock = open_socket()
+        sock.setblocking(False)
+        sockets.append(sock)
+    servers = [(host, port) for port in ports]
+    requests = [pack_request(DATE_REQUEST), pack_request(TIME_REQUEST)]
+    # Slots that can send a request, and the send time of each outstanding request
+    free = deque((sock, server) for sock in sockets for server in servers)
+    outstanding = {}
+    latencies = []
+    received = dict.fromkeys(ports, 0)
+    sent = lost = invalid = 0
+    interval = 1.0 / options["--rate"]
+    start = time.monotonic()
+    end = start + options["--duration"]
+    next_send = start
+    now = start
+    while now < end or (outstanding and now < end + BENCH_TIMEOUT):
+        # Sending every request that is due while a slot is free
+        while now < end and next_send <= now and free:
+            sock, server = free.popleft()
+            try:
+                sock.sendto(requests[sent % 2], wire_address(sock, server))
+            except BlockingIOError:
+                free.appendleft((sock, server))
+                break
+            outstanding[(sock, server)] = now
+            sent += 1
+            next_send += interval
+        # Only catching up on a small amount of the schedule once slots are freed
+        next_send = max(next_send, now - 0.1)
+        # Counting requests that have waited too long as lost
+        for slot, sent_at in list(outstanding.items()):
+            if now - sent_at > BENCH_TIMEOUT:
+                del outstanding[slot]
+                free.append(slot)
+                lost += 1
+        reads, writes, exceps = select(sockets, [], [], max(0.0, min(next_send - now, 0.01)))
+        for sock in reads:
+            while True:
+                try:
+                    pkt, address = sock.recvfrom(BUFFER_SIZE)
+                except BlockingIOError:
+                    break
+                address = peer_address(address)
+                sent_at = outstanding.pop((sock, address), None)
+                if sent_at is None:
+                    # Response arrived after its request was counted as lost
+                    continue
+                latencies.append(time.monotonic() - sent_at)
+                free.append((sock, address))
+                if check_packet(pkt):
+                    invalid += 1
+                received[address[1]] += 1
+        now = time.monotonic()
+    lost += len(outstanding)
+    for sock in sockets:
+        sock.close()
+    # Working out the results of the benchmark
+    latencies.sort()
+    total = sum(received.values())
+    return {
+        "host": host,
+        "ports": ports,
+        "rate": options["--rate"],
+        "concurrency": options["--concurrency"],
+        "duration": options["--duration"],
+        "sent": sent,
+        "received": total,
+        "received_per_port": {str(port): count for port, count in received.items()},
+        "invalid": invalid,
+        "lost": lost,
+        "loss_rate": lost / sent if sent else 0.0,
+        "throughput": total / (now - start),
+        "latency_ms": {name: (None if value is None else value * 1000.0) for name, value in [
+            ("p50", percentile(latencies, 0.50)),
+            ("p99", percentile(latencies, 0.99)),
+            ("p999", percentile(latencies, 0.999)),
+            ("max", latencies[-1] if latencies else None)]},
+    }
+
+
+def run_bench(args):
+    """
+    Runs the bench mode and outputs its results as JSON
+    :param args: The command line arguments following 'bench'
+    """
+    options, host, ports = process_bench_inputs(args)
+    results = bench(host, ports, options)
+    text = json.dumps(results, indent=2)
+    if options["--output"]:
+        with open(options["--output"], "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+
+def wait(socket, pkt, server, retries=DEFAULT_OPTIONS["--retries"], hedge=None, estimator=None,
+         cache=None, key=None):
+    """
+    Sending the request packet to the server and then waiting for a response,
+    the request is resent with exponential backoff if no response arrives and
+    a duplicate is sent to the hedge server if the first response is slow
+    :param socket: The clients socket
+    :param pkt: The packet to be sent
+    :param server: The address of the server to send the packet to
+    :param retries: Times the request is resent if no response arrives
+    :param hedge: The address of a second server, or None
+    :param estimator: The RttEstimator used to work out the timeouts
+    :param cache: The ResponseCache a valid response is saved to, or None
+    :param key: The (host, port) and request type the response is cached under
+    """
+    if estimator is None:
+        estimator = RttEstimator()
+    hedge_at = None
+    for attempt in range(retries + 1):
+        # Sending request packet to the server
+        sent_at = time.monotonic()
+        socket.sendto(pkt, wire_address(socket, server))
+        print("-----------------------------")
         print("-----------------------------")
+        print("Request packet sent to {0}: ".format(server))
+        print(pkt)
         print("-----------------------------")
-        # Closing the socket
-        socket.close()
-        handle_packet(pkt)
+        deadline = sent_at + estimator.timeout(attempt)
+        if hedge and attempt == 0:
+            hedge_at = sent_at + estimator.hedge_delay()
+        # Waiting for a response until the timeout of this attempt has passed
+        now = sent_at
+        while now < deadline:
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            reads, writes, exceps = select([socket], [], [], max(0.0, wake - now))
+            if len(reads) != 0:
+                # Receiving response from the server
+                pkt_received, address = socket.recvfrom(BUFFER_SIZE)
+                address = peer_address(address)
+                if attempt == 0 and address == server:
+                    estimator.update(time.monotonic() - sent_at)
+                # Packet has been received from the server
+                print("Response packet received from {0}: ".format(address))
+                print(pkt_received)
+                print("-----------------------------")
+                print("-----------------------------")
+                # Closing the socket
+                socket.close()
+                if cache and address == server and check_packet(pkt_received) is None:
+                    # Responses from the hedge server aren't cached, it may answer in another language
+                    cache.put(key[0], key[1], pkt_received)
+                handle_packet(pkt_received)
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at:
+                # First response is slow so a duplicate is sent to the hedge server
+                socket.sendto(pkt, wire_address(socket, hedge))
+                print("Response slow, request packet also sent to {0}".format(hedge))
+                hedge_at = None
+        if attempt < retries:
+            print("No response, request will be resent")
+    # Server did not respond fast enough
+    print("*****************************")
+    print("Response too slow, program will terminate")
+    print("*****************************")
+    # Closing the socket
+    socket.close()
+    sys.exit()
 
 
 def main():
@@ -201,17 +1288,40 @@ def main():
     """
     # Getting the inputs passed from the user
     args = sys.argv[1:]
-    request, port, host = process_inputs(args)
-    server = (host, port)
+    if args and args[0] == "bench":
+        # Running a benchmark rather than a single request
+        run_bench(args[1:])
+        return
+    options, args = process_options(args)
+    request, port, addresses = process_inputs(args)
+    cache = key = None
+    if options["--cache"] and request is not None:
+        # Answering from the cache file if the request was answered this minute
+        cache = ResponseCache(options["--cache"], options["--skew"])
+        key = ((args[1], port), request | options["--zone"] << ZONE_SHIFT)
+        packet = cache.get(*key)
+        if packet is not None:
+            print("-----------------------------")
+            print("-----------------------------")
+            print("Response packet found in cache {0}: ".format(options["--cache"]))
+            print(packet)
+            print("-----------------------------")
+            print("-----------------------------")
+            handle_packet(packet)
+    server = addresses[0]
+    # Racing the next address against the first one when the host has several
+    hedge = options["--hedge"] or (addresses[1] if len(addresses) > 1 else None)
     # Opening socket to communicate with the server
-    socket = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    socket = open_socket()
     # Creating a request packet
-    request_packet = bytearray(6)
-    request_packet[0:2] = MAGIC_NUMBER.to_bytes(2, "big", signed=False)
-    request_packet[2:4] = REQUEST_PACKET.to_bytes(2, "big", signed=False)
-    request_packet[4:6] = request.to_bytes(2, "big", signed=False)
-    # Passing the pkt to be sent and then waiting for 1 second for a response from the server
-    wait(socket, request_packet, server)
+    if request is None:
+        zone = options["--zone"] << ZONE_SHIFT
+        request_packet = pack_batch_request([(lang_code, request_type | zone) for lang_code in LANGUAGE_NAMES
+                                             for request_type in (DATE_REQUEST, TIME_REQUEST)])
+    else:
+        request_packet = pack_request(request, options["--zone"])
+    # Passing the pkt to be sent and then waiting for a response from the server
+    wait(socket, request_packet, server, options["--retries"], hedge, cache=cache, key=key)
 
 
 if __name__ == "__main__":
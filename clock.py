@@ -0,0 +1,73 @@
+##################################
+# COSC264 Sockets Assignment 2018 - clock.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Clocks read by timezones.py, a FakeClock can be passed in place of the
+# system clock so time dependent behaviour is deterministic
+##################################
+
+
+# Importing used modules
+import time
+
+
+class SystemClock:
+    """
+    Reads the system's wall clock
+    """
+    __slots__ = ()
+
+    def time(self):
+        """
+        Reads the wall clock
+        :return: Seconds since the epoch, as time.time()
+        """
+        return time.time()
+
+
+class FakeClock:
+    """
+    A clock that only moves when it is told to, for tests and benchmarks
+    """
+    __slots__ = ("wall",)
+
+    def __init__(self, wall=0.0):
+        """
+        Creates a stopped clock
+        :param wall: The time the clock starts at, in seconds since the epoch
+        """
+        self.wall = wall
+
+    def time(self):
+        """
+        Reads the clock
+        :return: Seconds since the epoch
+        """
+        return self.wall
+
+    def advance(self, seconds):
+        """
+        Moves the clock, as time passing or as NTP stepping the clock would
+        :param seconds: The seconds the clock is moved by, negative to move it back
+        """
+        self.wall += seconds
+
+    def set(self, wall):
+        """
+        Sets the clock to a time
+        :param wall: The time in seconds since the epoch
+        """
+        self.wall = wall
+
+
+# The clock used when no other clock is given
+SYSTEM_CLOCK = SystemClock()
+
+
+##################################
+# End of clock.py file
+##################################
@@ -0,0 +1,340 @@
+##################################
+# COSC264 Sockets Assignment 2018 - fuzz.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Usage:
+# python3 fuzz.py [--examples N] [--seed S] [--output FILE]
+# Runs random and mutated packets through the server's decode_packet() and
+# the client's check_packet(), checking that neither raises, that every
+# accepted packet can be answered or read, and that rejecting a packet
+# costs less than answering a valid one. Hypothesis is used to make the
+# packets when it is installed, otherwise they are made with random.
+# Options:
+#   --examples N    Packets run through the validators (default 10000)
+#   --seed S        Seed the packets are made from (default 0)
+#   --output FILE   File the JSON results are written to (default stdout)
+##################################
+
+
+# Importing used modules
+import json
+import random
+import sys
+import time
+import timeit
+import client
+import server
+from clock import FakeClock
+from languages import DEFAULT_CATALOGUE
+from protocol import (DATE_REQUEST, TIME_REQUEST, ENGLISH_CODE, MAX_BATCH, pack_request,
+                      pack_batch_request)
+try:
+    # Hypothesis is optional, it makes and shrinks the packets when installed
+    import hypothesis
+    from hypothesis import strategies
+except ImportError:
+    hypothesis = None
+
+
+# Defining the options along with their default values
+DEFAULT_OPTIONS = {"--examples": 10000, "--seed": 0, "--output": ""}
+USAGE = "Usage: python3 fuzz.py [--examples N] [--seed S] [--output FILE]"
+# Time zones loaded into the server so requests can pick zones 1 and 2
+ZONES = "UTC,Pacific/Auckland"
+# Longest random packet made, most junk is short so most packets are shorter
+MAX_PACKET = client.BUFFER_SIZE
+# Values written over a 16 bit field by a mutation, the edges of each field
+BOUNDARY_VALUES = [0, 1, 2, 3, 4, 0xFF, 0x100, MAX_BATCH, MAX_BATCH + 1, 0x497E, 0xFFFF]
+# Number of times the rejected packets are timed, the best run is kept
+REPEAT = 5
+
+
+class FuzzError(Exception):
+    """
+    Raised when a validator fails on a packet
+    """
+
+
+def process_options(args):
+    """
+    Processing the command line arguments
+    :param args: The command line arguments
+    :return: A dictionary holding the value of every option
+    """
+    text = None
+    options = dict(DEFAULT_OPTIONS)
+    if len(args) % 2 != 0:
+        text = "Invalid number of inputs"
+    for index in range(0, len(args) - 1, 2):
+        if args[index] not in DEFAULT_OPTIONS:
+            text = "Unknown option {0}".format(args[index])
+            break
+        try:
+            options[args[index]] = type(DEFAULT_OPTIONS[args[index]])(args[index + 1])
+        except ValueError:
+            text = "Invalid value for option {0}".format(args[index])
+    if not text and options["--examples"] < 1:
+        text = "Invalid number of examples, at least 1 packet must be run"
+    if text:
+        print("*****************************")
+        print(text)
+        print("*****************************")
+        print(USAGE)
+        print("Program will now exit")
+        sys.exit()
+    return options
+
+
+def setup_server():
+    """
+    Loads the server's languages and time zones, with its clock stopped so
+    the responses are made for the same minute throughout
+    """
+    server.load_languages(DEFAULT_CATALOGUE)
+    server.load_zones(ZONES, [])
+    server.set_clock(FakeClock(time.time()))
+
+
+def make_seeds():
+    """
+    Makes the valid packets that are mutated, every kind of request and
+    the server's responses to them
+    :return: A list of the packets
+    """
+    requests = [pack_request(request_type, zone) for zone in range(len(server.ZONE_LIST))
+                for request_type in (DATE_REQUEST, TIME_REQUEST)]
+    entries = [(language.code, request_type) for language in server.LANGUAGE_LIST
+               for request_type in (DATE_REQUEST, TIME_REQUEST)]
+    requests.append(pack_batch_request(entries[:1]))
+    requests.append(pack_batch_request(entries))
+    responses = [server.handle_packet(request, ENGLISH_CODE) for request in requests]
+    return requests + responses
+
+
+def mutate(rng, packet):
+    """
+    Changes a valid packet in one to three random ways
+    :param rng: The random.Random the changes are picked with
+    :param packet: The packet to change
+    :return: The changed packet
+    """
+    pkt = bytearray(packet)
+    for i in range(rng.randint(1, 3)):
+        change = rng.randrange(6)
+        position = rng.randint(0, len(pkt))
+        if change == 0 and pkt:
+            # Flipping a bit
+            pkt[position % len(pkt)] ^= 1 << rng.randrange(8)
+        elif change == 1 and pkt:
+            # Setting a byte to any value
+            pkt[position % len(pkt)] = rng.randrange(256)
+        elif change == 2:
+            # Cutting the packet short
+            del pkt[position:]
+        elif change == 3:
+            # Adding bytes to the end
+            pkt += rng.randbytes(rng.randint(1, 16))
+        elif change == 4:
+            # Adding bytes part way through
+            pkt[position:position] = rng.randbytes(rng.randint(1, 4))
+        elif len(pkt) >= 2:
+            # Writing the edge of a field over a 16 bit field
+            position = rng.randrange(0, len(pkt) - 1, 2)
+            pkt[position:position + 2] = rng.choice(BOUNDARY_VALUES).to_bytes(2, "big")
+    return bytes(pkt)
+
+
+def random_packet(rng, seeds):
+    """
+    Makes a packet to fuzz the validators with, either random bytes or a
+    mutated valid packet
+    :param rng: The random.Random the packet is made with
+    :param seeds: The valid packets that are mutated
+    :return: The packet
+    """
+    if rng.random() < 0.25:
+        length = rng.randint(0, MAX_PACKET) if rng.random() < 0.1 else rng.randint(0, 64)
+        return rng.randbytes(length)
+    return mutate(rng, rng.choice(seeds))
+
+
+def check_packet(pkt, counts):
+    """
+    Runs a packet through both validators, the server is given a view of a
+    buffer as it is when the packet is received from a socket
+    :param pkt: The packet
+    :param counts: A dictionary of the counts that are updated
+    :raises FuzzError: If a validator raised or accepted a packet that can't be used
+    """
+    counts["packets"] += 1
+    try:
+        result = server.decode_packet(memoryview(bytearray(pkt)))
+    except Exception as e:
+        raise FuzzError("decode_packet() raised {0!r} on {1}".format(e, pkt))
+    if result not in (0, 1):
+        raise FuzzError("decode_packet() returned {0!r} on {1}".format(result, pkt))
+    if result == 0:
+        counts["server_accepted"] += 1
+        # An accepted request must be answered with a response the client accepts
+        try:
+            response = server.handle_packet(pkt, ENGLISH_CODE)
+        except Exception as e:
+            raise FuzzError("handle_packet() raised {0!r} on accepted request {1}".format(e, pkt))
+        text = response and client.check_packet(response)
+        if not response or text:
+            raise FuzzError("Accepted request {0} was answered with invalid response {1}: {2}".format(
+                pkt, response, text))
+    try:
+        text = client.check_packet(pkt)
+        if text is None:
+            counts["client_accepted"] += 1
+            # An accepted response must be readable
+            response = client.unpack_packet(pkt)
+            for record in response if isinstance(response, list) else [response]:
+                record.decoded_text()
+    except Exception as e:
+        raise FuzzError("Client raised {0!r} on {1}".format(e, pkt))
+
+
+def fuzz_random(options, seeds, counts):
+    """
+    Fuzzes the validators with packets made with random
+    :param options: A dictionary holding the value of every option
+    :param seeds: The valid packets that are mutated
+    :param counts: A dictionary of the counts that are updated
+    :return: A list of the packets run, kept for timing
+    """
+    rng = random.Random(options["--seed"])
+    packets = []
+    for i in range(options["--examples"]):
+        pkt = random_packet(rng, seeds)
+        check_packet(pkt, counts)
+        packets.append(pkt)
+    return packets
+
+
+def packet_strategy(seeds):
+    """
+    Makes the Hypothesis strategy the packets are drawn from, either random
+    bytes or a mutated valid packet, the tests draw from it too
+    :param seeds: The valid packets that are mutated
+    :return: The strategy
+    """
+    mutated = strategies.builds(mutate, strategies.randoms(use_true_random=False),
+                                strategies.sampled_from(seeds))
+    junk = strategies.binary(max_size=MAX_PACKET)
+    return strategies.one_of(mutated, junk)
+
+
+def fuzz_hypothesis(options, seeds, counts):
+    """
+    Fuzzes the validators with packets made by Hypothesis, which shrinks a
+    failing packet to the smallest one that still fails
+    :param options: A dictionary holding the value of every option
+    :param seeds: The valid packets that are mutated
+    :param counts: A dictionary of the counts that are updated
+    :return: A list of the packets run, kept for timing
+    """
+    packets = []
+
+    @hypothesis.seed(options["--seed"])
+    @hypothesis.settings(max_examples=options["--examples"], deadline=None, database=None,
+                         suppress_health_check=list(hypothesis.HealthCheck))
+    @hypothesis.given(packet_strategy(seeds))
+    def run(pkt):
+        check_packet(pkt, counts)
+        packets.append(pkt)
+
+    run()
+    return packets
+
+
+def time_packets(function, packets):
+    """
+    Times a validator over a group of packets
+    :param function: The validator, called with each packet
+    :param packets: The packets
+    :return: The mean time taken by a packet in nanoseconds, from the best run
+    """
+    if not packets:
+        return 0.0
+
+    def run():
+        for pkt in packets:
+            function(pkt)
+
+    number = max(1, 20000 // len(packets))
+    return min(timeit.repeat(run, number=number, repeat=REPEAT)) / number / len(packets) * 1e9
+
+
+def time_validators(packets):
+    """
+    Times rejecting the fuzzed packets that are invalid against accepting
+    and answering a valid packet
+    :param packets: The fuzzed packets
+    :return: A dictionary of the mean time per packet of each case in nanoseconds
+    """
+    address = ("192.0.2.1", 1024)
+    views = [memoryview(bytearray(pkt)) for pkt in packets]
+    rejected = [view for view in views if server.decode_packet(view)]
+    request = memoryview(bytearray(pack_request(DATE_REQUEST)))
+    junk = [pkt for pkt in packets if client.check_packet(pkt)]
+    response = server.handle_packet(pack_request(DATE_REQUEST), ENGLISH_CODE)
+    return {
+        "server_reject_ns": time_packets(lambda view: server.answer_request(view, address, ENGLISH_CODE),
+                                         rejected),
+        "server_answer_ns": time_packets(lambda view: server.answer_request(view, address, ENGLISH_CODE),
+                                         [request]),
+        "client_reject_ns": time_packets(client.check_packet, junk),
+        "client_accept_ns": time_packets(client.check_packet, [response]),
+    }
+
+
+def main():
+    """
+    Fuzzes the validators and outputs the results
+    """
+    options = process_options(sys.argv[1:])
+    setup_server()
+    seeds = make_seeds()
+    counts = dict.fromkeys(["packets", "server_accepted", "client_accepted"], 0)
+    try:
+        if hypothesis:
+            packets = fuzz_hypothesis(options, seeds, counts)
+        else:
+            packets = fuzz_random(options, seeds, counts)
+    except FuzzError as e:
+        print("*****************************")
+        print(e)
+        print("*****************************")
+        sys.exit(1)
+    results = dict(counts)
+    results["generator"] = "hypothesis" if hypothesis else "random"
+    results.update(time_validators(packets))
+    text = json.dumps(results, indent=2)
+    if options["--output"]:
+        with open(options["--output"], "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    slower = [name for name, reject, accept in (
+        ("server", results["server_reject_ns"], results["server_answer_ns"]),
+        ("client", results["client_reject_ns"], results["client_accept_ns"])) if reject > accept]
+    if slower:
+        print("*****************************")
+        print("Rejecting a packet costs more than accepting one in: {0}".format(", ".join(slower)))
+        print("*****************************")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+##################################
+# End of fuzz.py file
+##################################
@@ -0,0 +1,164 @@
+##################################
+# COSC264 Sockets Assignment 2018 - handoff.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Passes the bound sockets of a running server.py to the server replacing
+# it over a Unix socket, so a restart doesn't close the ports
+##################################
+
+
+# Importing used modules
+import os
+import socket as soc
+
+
+# Message sent with the sockets and the reply that accepts them
+OFFER = b"DTSOCKETS"
+ACCEPT = b"OK"
+# Most sockets that can be handed over at once
+MAX_SOCKETS = 256
+# Seconds the new server waits for the running server to send its sockets,
+# the running server keeps serving while it waits for the reply
+HANDOFF_TIMEOUT = 5.0
+
+
+class HandoffError(Exception):
+    """
+    Raised when sockets can't be taken over from a running server
+    """
+
+
+class HandoffListener:
+    """
+    The Unix socket a running server listens on for its replacement
+    """
+
+    def __init__(self, path):
+        """
+        Starts listening, replacing any file left at the path
+        :param path: The path of the Unix socket
+        """
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)
+        self.socket = soc.socket(soc.AF_UNIX, soc.SOCK_STREAM)
+        self.socket.bind(path)
+        self.socket.listen(1)
+        self.socket.setblocking(False)
+        # Kept so the path is only removed while it is still this listener's
+        self.inode = os.stat(path).st_ino
+        # The connection to a new server that has been sent the sockets and
+        # hasn't replied yet, None when no handoff is in progress
+        self.conn = None
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def offer(self, sockets):
+        """
+        Sends the sockets to a new server that has connected, without waiting
+        for its reply so this server can keep serving while the new one starts
+        :param sockets: The bound sockets
+        :return: The connection the reply arrives on, None if no server
+        connected or the sockets couldn't be sent
+        """
+        try:
+            conn, unused = self.socket.accept()
+        except BlockingIOError:
+            return None
+        try:
+            conn.settimeout(HANDOFF_TIMEOUT)
+            soc.send_fds(conn, [OFFER], [sock.fileno() for sock in sockets])
+            conn.setblocking(False)
+        except OSError:
+            conn.close()
+            return None
+        self.conn = conn
+        return conn
+
+    def reply(self):
+        """
+        Reads the new server's reply once its connection is ready to be read,
+        the connection is closed once the handoff is over
+        :return: True if the new server accepted the sockets and this server
+        should stop, False if it failed, None if it hasn't replied yet
+        """
+        try:
+            # The new server replies once it is ready to serve, or closes
+            # the connection if it failed to start
+            accepted = self.conn.recv(len(ACCEPT)) == ACCEPT
+        except BlockingIOError:
+            return None
+        except OSError:
+            accepted = False
+        self.conn.close()
+        self.conn = None
+        return accepted
+
+    def close(self, remove=True):
+        """
+        Stops listening
+        :param remove: Flag holding if the path is removed, it is kept when a
+        new server has taken it over
+        """
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+        self.socket.close()
+        try:
+            if remove and os.stat(self.path).st_ino == self.inode:
+                os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def take_over(path):
+    """
+    Asks the server listening on a path for its sockets
+    :param path: The path of the running server's Unix socket
+    :return: A list of the sockets and the connection accept() is called
+    on once the new server is ready, or None if no server is listening
+    :raises HandoffError: If the server answered but the handoff failed
+    """
+    conn = soc.socket(soc.AF_UNIX, soc.SOCK_STREAM)
+    conn.settimeout(HANDOFF_TIMEOUT)
+    try:
+        conn.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        conn.close()
+        return None
+    try:
+        message, fds, flags, unused = soc.recv_fds(conn, len(OFFER), MAX_SOCKETS)
+    except OSError as e:
+        conn.close()
+        raise HandoffError("Receiving sockets from {0} failed: {1}".format(path, e))
+    sockets = [soc.socket(fileno=fd) for fd in fds]
+    if message != OFFER or not sockets:
+        for sock in sockets:
+            sock.close()
+        conn.close()
+        raise HandoffError("Server on {0} didn't send any sockets".format(path))
+    return sockets, conn
+
+
+def accept(conn):
+    """
+    Tells the old server the sockets have been taken over so it can stop
+    :param conn: The connection returned by take_over()
+    """
+    try:
+        conn.sendall(ACCEPT)
+    except OSError:
+        # The old server has already stopped, the sockets are still this server's
+        pass
+    finally:
+        conn.close()
+
+
+##################################
+# End of handoff.py file
+##################################
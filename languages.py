@@ -0,0 +1,114 @@
+##################################
+# COSC264 Sockets Assignment 2018 - languages.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Loads the language catalogue used by server.py and client.py
+##################################
+
+
+# Importing used modules
+import json
+import os
+
+
+# The catalogue used when no other catalogue is given
+DEFAULT_CATALOGUE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.json")
+# Values used to check that a template only uses the fields it is given
+SAMPLE_DATE = {"year": 2018, "month": 8, "day": 1, "month_name": ""}
+SAMPLE_TIME = {"hour": 9, "minute": 5}
+
+
+class CatalogueError(Exception):
+    """
+    Raised when the language catalogue can't be loaded
+    """
+
+
+class Language:
+    """
+    A language from the catalogue, its templates are compiled into
+    formatters once when the catalogue is loaded
+    """
+    __slots__ = ("code", "name", "months", "date_format", "time_format")
+
+    def __init__(self, code, name, months, date_template, time_template):
+        """
+        Creates a language
+        :param code: The language code sent in response packets
+        :param name: The name of the language
+        :param months: The names of the twelve months
+        :param date_template: Template of the date text, using the fields
+        year, month, day and month_name
+        :param time_template: Template of the time text, using the fields
+        hour and minute
+        """
+        self.code = code
+        self.name = name
+        self.months = tuple(months)
+        self.date_format = date_template.format
+        self.time_format = time_template.format
+
+    def date_text(self, year, month, day):
+        """
+        Creates a textual representation of a date
+        :param year: The year
+        :param month: The month
+        :param day: The day
+        :return: The textual representation of the date
+        """
+        return self.date_format(year=year, month=month, day=day, month_name=self.months[month - 1])
+
+    def time_text(self, hour, minute):
+        """
+        Creates a textual representation of a time
+        :param hour: The hour
+        :param minute: The minute
+        :return: The textual representation of the time
+        """
+        return self.time_format(hour=hour, minute=minute)
+
+
+def load_catalogue(path=DEFAULT_CATALOGUE):
+    """
+    Loads and checks the language catalogue
+    :param path: The path of the catalogue file
+    :return: A list of the Languages in the order they are in the catalogue
+    """
+    try:
+        with open(path, encoding="utf-8") as catalogue:
+            entries = json.load(catalogue)["languages"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise CatalogueError("Language catalogue {0} can't be read: {1}".format(path, e))
+    languages = []
+    codes = set()
+    for entry in entries:
+        try:
+            language = Language(entry["code"], entry["name"], entry["months"], entry["date"], entry["time"])
+        except (KeyError, TypeError, AttributeError):
+            raise CatalogueError("Language {0} is missing a field".format(entry))
+        if not isinstance(language.code, int) or not 0 < language.code <= 0xFFFF:
+            raise CatalogueError("Language {0} has an invalid code".format(language.name))
+        if language.code in codes:
+            raise CatalogueError("Language code {0} is used more than once".format(language.code))
+        if len(language.months) != 12:
+            raise CatalogueError("Language {0} doesn't have twelve months".format(language.name))
+        # Checking the templates only use the fields they are given
+        try:
+            language.date_format(**SAMPLE_DATE)
+            language.time_format(**SAMPLE_TIME)
+        except (KeyError, IndexError, ValueError) as e:
+            raise CatalogueError("Language {0} has an invalid template: {1}".format(language.name, e))
+        codes.add(language.code)
+        languages.append(language)
+    if not languages:
+        raise CatalogueError("Language catalogue {0} has no languages".format(path))
+    return languages
+
+
+##################################
+# End of languages.py file
+##################################
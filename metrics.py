@@ -0,0 +1,232 @@
+##################################
+# COSC264 Sockets Assignment 2018 - metrics.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Counters and histograms kept by server.py, served as Prometheus text
+##################################
+
+
+# Importing used modules, cProfile and pstats are imported when profiling
+# is turned on as they are slow to import
+import logging
+import os
+import threading
+from bisect import bisect_left
+
+
+# Upper bounds in seconds of the buckets of the processing time histogram
+PROCESSING_BUCKETS = [0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01]
+# Number of functions listed when a profile is logged
+PROFILE_LINES = 20
+
+
+log = logging.getLogger("server")
+
+
+class Histogram:
+    """
+    Counts observed values into fixed buckets
+    """
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        """
+        Creates an empty histogram
+        :param bounds: The sorted upper bounds of the buckets
+        """
+        self.bounds = bounds
+        # The last bucket holds the values above every bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Adds a value to the histogram
+        :param value: The value observed
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, lines):
+        """
+        Adds the histogram to a Prometheus text exposition
+        :param name: The name of the metric
+        :param lines: The list of lines the histogram is added to
+        """
+        lines.append("# TYPE {0} histogram".format(name))
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append('{0}_bucket{{le="{1}"}} {2}'.format(name, bound, cumulative))
+        lines.append('{0}_bucket{{le="+Inf"}} {1}'.format(name, self.count))
+        lines.append("{0}_sum {1}".format(name, self.total))
+        lines.append("{0}_count {1}".format(name, self.count))
+
+
+class Metrics:
+    """
+    The counters and histograms of a server process
+    """
+
+    def __init__(self, languages):
+        """
+        Creates metrics with every counter at zero
+        :param languages: A dictionary of language code to language name
+        """
+        self.languages = languages
+        self.received = 0
+        self.valid = 0
+        self.send_errors = 0
+        # Invalid packets keyed by the reason they were discarded
+        self.invalid = {}
+        # Requests keyed by (language code, request flag)
+        self.requests = {}
+        # Requests dropped by the rate limiter keyed by the limit that dropped them
+        self.rate_limited = {}
+        # Datagrams the kernel dropped as a receive buffer was full, keyed by
+        # (language code, file descriptor) of the socket as --bind opens
+        # several sockets for each language, as last reported by the kernel
+        self.kernel_drops = {}
+        self.processing = Histogram(PROCESSING_BUCKETS)
+
+    def count_invalid(self, reason):
+        """
+        Counts a packet that was discarded
+        :param reason: The reason the packet was discarded
+        """
+        self.invalid[reason] = self.invalid.get(reason, 0) + 1
+
+    def count_rate_limited(self, limit):
+        """
+        Counts a request that was dropped by the rate limiter
+        :param limit: The limit that dropped the request
+        """
+        self.rate_limited[limit] = self.rate_limited.get(limit, 0) + 1
+
+    def set_kernel_drops(self, lang_code, fd, count):
+        """
+        Records the drop count the kernel reported for a socket
+        :param lang_code: The language of the socket
+        :param fd: The file descriptor of the socket
+        :param count: The datagrams dropped on the socket since it was opened
+        """
+        self.kernel_drops[(lang_code, fd)] = count
+
+    def count_request(self, lang_code, request_flag):
+        """
+        Counts a request that was answered
+        :param lang_code: The language of the request
+        :param request_flag: True if the date was requested, False for the time
+        """
+        key = (lang_code, request_flag)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+    def render(self):
+        """
+        Creates a Prometheus text exposition of the metrics
+        :return: The exposition as a string
+        """
+        lines = ["# TYPE datetime_packets_received_total counter",
+                 "datetime_packets_received_total {0}".format(self.received),
+                 "# TYPE datetime_packets_valid_total counter",
+                 "datetime_packets_valid_total {0}".format(self.valid),
+                 "# TYPE datetime_packets_invalid_total counter"]
+        for reason, count in sorted(self.invalid.items()):
+            lines.append('datetime_packets_invalid_total{{reason="{0}"}} {1}'.format(reason, count))
+        lines.append("# TYPE datetime_requests_total counter")
+        for (lang_code, request_flag), count in sorted(self.requests.items()):
+            request = "date" if request_flag else "time"
+            lines.append('datetime_requests_total{{language="{0}",type="{1}"}} {2}'.format(
+                self.languages.get(lang_code, lang_code), request, count))
+        lines.append("# TYPE datetime_packets_rate_limited_total counter")
+        for limit, count in sorted(self.rate_limited.items()):
+            lines.append('datetime_packets_rate_limited_total{{limit="{0}"}} {1}'.format(limit, count))
+        lines.append("# TYPE datetime_kernel_drops_total counter")
+        drops = {}
+        for (lang_code, fd), count in self.kernel_drops.items():
+            drops[lang_code] = drops.get(lang_code, 0) + count
+        for lang_code, count in sorted(drops.items()):
+            lines.append('datetime_kernel_drops_total{{language="{0}"}} {1}'.format(
+                self.languages.get(lang_code, lang_code), count))
+        lines.append("# TYPE datetime_send_errors_total counter")
+        lines.append("datetime_send_errors_total {0}".format(self.send_errors))
+        self.processing.render("datetime_processing_seconds", lines)
+        return "\n".join(lines) + "\n"
+
+
+def start_endpoint(metrics, port):
+    """
+    Serves the metrics over HTTP on localhost from a background thread
+    :param metrics: The Metrics to serve
+    :param port: The port the endpoint is bound to
+    :return: The HTTP server, calling shutdown() on it stops the endpoint
+    """
+    # Imported here as http.server is slow to import and most servers don't serve metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes aren't logged
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
+class ProfileToggle:
+    """
+    Turns cProfile on and off each time a signal is received, the profile is
+    written to a file and its slowest functions are logged when it is turned off
+    """
+
+    def __init__(self):
+        """
+        Creates a toggle with profiling turned off
+        """
+        self.profile = None
+
+    def __call__(self, signum, frame):
+        """
+        Signal handler that turns profiling on or off
+        :param signum: The signal that was received
+        :param frame: The frame that was running when the signal was received
+        """
+        if self.profile is None:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            log.warning("Profiling started")
+            return
+        self.profile.disable()
+        path = "server-{0}.prof".format(os.getpid())
+        self.profile.dump_stats(path)
+        import pstats
+        stats = pstats.Stats(self.profile)
+        log.warning("Profiling stopped, profile written to %s", path)
+        # Logging the functions with the most cumulative time
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_LINES]
+        for (filename, line, name), (primitive, calls, own, cumulative, callers) in rows:
+            log.warning("%10d calls %9.6fs own %9.6fs cumulative %s:%d(%s)",
+                        calls, own, cumulative, os.path.basename(filename), line, name)
+        self.profile = None
+
+
+##################################
+# End of metrics.py file
+##################################
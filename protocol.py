@@ -0,0 +1,240 @@
+##################################
+# COSC264 Sockets Assignment 2018 - protocol.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Packet encoding and decoding shared by server.py and client.py
+##################################
+
+
+# Importing used modules
+import struct
+
+
+# Defining constants
+MAGIC_NUMBER = 0x497E
+REQUEST_PACKET = 0x0001
+RESPONSE_PACKET = 0x0002
+BATCH_REQUEST_PACKET = 0x0003
+BATCH_RESPONSE_PACKET = 0x0004
+DATE_REQUEST = 0x0001
+TIME_REQUEST = 0x0002
+ENGLISH_CODE = 0x0001
+MAORI_CODE = 0x0002
+GERMAN_CODE = 0x0003
+# The low byte of the request type holds DATE_REQUEST or TIME_REQUEST, a
+# non-zero high byte picks one of the time zones the server was given
+REQUEST_TYPE_MASK = 0x00FF
+ZONE_SHIFT = 8
+
+
+# Defining the layout of the packets, all fields are big endian
+# Request: magic number, packet type, request type
+REQUEST_STRUCT = struct.Struct(">HHH")
+# Response header: magic number, packet type, language code, year,
+# month, day, hour, minute, length of the textual field
+RESPONSE_STRUCT = struct.Struct(">HHHHBBBBB")
+REQUEST_LENGTH = REQUEST_STRUCT.size
+RESPONSE_HEADER_LENGTH = RESPONSE_STRUCT.size
+# The longest textual field that fits in the length field
+MAX_TEXT_LENGTH = 255
+# Batch header: magic number, packet type, number of entries or records
+BATCH_STRUCT = struct.Struct(">HHH")
+# Batch request entry: language code, request type
+BATCH_ENTRY_STRUCT = struct.Struct(">HH")
+# Batch response record: a response packet without its magic number and
+# packet type, so language code, year, month, day, hour, minute, length of
+# the textual field and then the textual field
+RECORD_STRUCT = struct.Struct(">HHBBBBB")
+BATCH_HEADER_LENGTH = BATCH_STRUCT.size
+BATCH_ENTRY_LENGTH = BATCH_ENTRY_STRUCT.size
+RECORD_HEADER_LENGTH = RECORD_STRUCT.size
+# Offset of the record held by a response packet
+RECORD_OFFSET = RESPONSE_HEADER_LENGTH - RECORD_HEADER_LENGTH
+# The most entries a batch request can hold
+MAX_BATCH = 64
+# Packet header: magic number and packet type, the first 4 bytes of every
+# packet. The header of each packet type is packed once so a packet can be
+# told apart from junk with a single bytes comparison.
+HEADER_STRUCT = struct.Struct(">HH")
+HEADER_LENGTH = HEADER_STRUCT.size
+MAGIC_BYTES = struct.pack(">H", MAGIC_NUMBER)
+REQUEST_HEADER = HEADER_STRUCT.pack(MAGIC_NUMBER, REQUEST_PACKET)
+RESPONSE_HEADER = HEADER_STRUCT.pack(MAGIC_NUMBER, RESPONSE_PACKET)
+BATCH_REQUEST_HEADER = HEADER_STRUCT.pack(MAGIC_NUMBER, BATCH_REQUEST_PACKET)
+BATCH_RESPONSE_HEADER = HEADER_STRUCT.pack(MAGIC_NUMBER, BATCH_RESPONSE_PACKET)
+
+
+class Request:
+    """
+    The fields of a request packet
+    """
+    __slots__ = ("magic_number", "packet_type", "request_type")
+
+    def __init__(self, magic_number, packet_type, request_type):
+        """
+        Creates a request from its fields
+        :param magic_number: The magic number of the packet
+        :param packet_type: The type of the packet
+        :param request_type: If the date or time is requested
+        """
+        self.magic_number = magic_number
+        self.packet_type = packet_type
+        self.request_type = request_type
+
+
+class Response:
+    """
+    The fields of a response packet, the text is a view of the packet
+    """
+    __slots__ = ("magic_number", "packet_type", "lang_code", "year", "month",
+                 "day", "hour", "minute", "length", "text")
+
+    def __init__(self, magic_number, packet_type, lang_code, year, month, day, hour, minute, length, text):
+        """
+        Creates a response from its fields
+        :param magic_number: The magic number of the packet
+        :param packet_type: The type of the packet
+        :param lang_code: The language the textual field is in
+        :param year: The year held by the packet
+        :param month: The month held by the packet
+        :param day: The day held by the packet
+        :param hour: The hour held by the packet
+        :param minute: The minute held by the packet
+        :param length: The length field of the packet
+        :param text: A memoryview of the encoded textual field
+        """
+        self.magic_number = magic_number
+        self.packet_type = packet_type
+        self.lang_code = lang_code
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.minute = minute
+        self.length = length
+        self.text = text
+
+    def decoded_text(self):
+        """
+        Decodes the textual field of the response
+        :return: The textual field as a string
+        """
+        return bytes(self.text).decode("utf-8")
+
+
+def pack_request(request_type, zone=0):
+    """
+    Creates a request packet
+    :param request_type: If the date or time is requested
+    :param zone: The index of the server's time zone the response is wanted
+    in, 0 for the zone of the port
+    :return: The request packet ready to be sent
+    """
+    return REQUEST_STRUCT.pack(MAGIC_NUMBER, REQUEST_PACKET, request_type | zone << ZONE_SHIFT)
+
+
+def unpack_request(pkt):
+    """
+    Reads the fields of a request packet, the length of the packet must
+    already have been checked
+    :param pkt: The received packet, any bytes-like object
+    :return: The request held by the packet
+    """
+    return Request(*REQUEST_STRUCT.unpack_from(pkt))
+
+
+def pack_response(lang_code, time, encoded_text):
+    """
+    Creates a response packet
+    :param lang_code: The language the textual field is in
+    :param time: A list holding the year, month, day, hour and minute
+    :param encoded_text: The UTF-8 encoded textual field
+    :return: The response packet as bytes
+    """
+    text_length = len(encoded_text)
+    response = bytearray(RESPONSE_HEADER_LENGTH + text_length)
+    RESPONSE_STRUCT.pack_into(response, 0, MAGIC_NUMBER, RESPONSE_PACKET, lang_code, time[0],
+                              time[1], time[2], time[3], time[4], text_length)
+    response[RESPONSE_HEADER_LENGTH:] = encoded_text
+    return bytes(response)
+
+
+def unpack_response(pkt):
+    """
+    Reads the fields of a response packet without copying the textual field,
+    the packet must be at least as long as the response header
+    :param pkt: The received packet, any bytes-like object
+    :return: The response held by the packet
+    """
+    view = memoryview(pkt)
+    fields = RESPONSE_STRUCT.unpack_from(view)
+    return Response(*fields, view[RESPONSE_HEADER_LENGTH:])
+
+
+def pack_batch_request(entries):
+    """
+    Creates a batch request packet
+    :param entries: A list of (language code, request type) pairs, the
+    request type can pick a time zone as in pack_request()
+    :return: The batch request packet ready to be sent
+    """
+    packet = bytearray(BATCH_HEADER_LENGTH + len(entries) * BATCH_ENTRY_LENGTH)
+    BATCH_STRUCT.pack_into(packet, 0, MAGIC_NUMBER, BATCH_REQUEST_PACKET, len(entries))
+    for index, (lang_code, request_type) in enumerate(entries):
+        BATCH_ENTRY_STRUCT.pack_into(packet, BATCH_HEADER_LENGTH + index * BATCH_ENTRY_LENGTH,
+                                     lang_code, request_type)
+    return bytes(packet)
+
+
+def unpack_batch_request(pkt):
+    """
+    Reads the entries of a batch request packet, the length of the packet
+    must already have been checked against its count
+    :param pkt: The received packet, any bytes-like object
+    :return: A list of (language code, request type) pairs
+    """
+    return list(BATCH_ENTRY_STRUCT.iter_unpack(memoryview(pkt)[BATCH_HEADER_LENGTH:]))
+
+
+def pack_batch_response(records):
+    """
+    Creates a batch response packet
+    :param records: A list of the records, each made by slicing a response
+    packet from RECORD_OFFSET
+    :return: The batch response packet as bytes
+    """
+    return BATCH_STRUCT.pack(MAGIC_NUMBER, BATCH_RESPONSE_PACKET, len(records)) + b"".join(records)
+
+
+def unpack_batch_response(pkt):
+    """
+    Reads the records of a batch response packet without copying their
+    textual fields, the packet must be at least as long as the batch header
+    :param pkt: The received packet, any bytes-like object
+    :return: A list of the Responses held by the records
+    :raises ValueError: If the records don't fill the packet exactly
+    """
+    view = memoryview(pkt)
+    count = BATCH_STRUCT.unpack_from(view)[2]
+    responses = []
+    offset = BATCH_HEADER_LENGTH
+    for index in range(count):
+        if offset + RECORD_HEADER_LENGTH > len(view):
+            raise ValueError("Invalid batch record length")
+        fields = RECORD_STRUCT.unpack_from(view, offset)
+        offset += RECORD_HEADER_LENGTH
+        text = view[offset:offset + fields[-1]]
+        offset += fields[-1]
+        responses.append(Response(MAGIC_NUMBER, BATCH_RESPONSE_PACKET, *fields, text))
+    if offset != len(view):
+        raise ValueError("Invalid packet length")
+    return responses
+
+
+##################################
+# End of protocol.py file
+##################################
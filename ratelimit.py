@@ -0,0 +1,170 @@
+##################################
+# COSC264 Sockets Assignment 2018 - ratelimit.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Token bucket rate limiting of the requests answered by server.py
+##################################
+
+
+# Importing used modules
+import socket as soc
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """
+    Holds up to burst tokens, refilled at a fixed rate, each request uses one
+    """
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        """
+        Creates a bucket
+        :param tokens: The number of tokens the bucket starts with
+        :param updated: The time.monotonic() time the tokens were counted at
+        """
+        self.tokens = tokens
+        self.updated = updated
+
+    def take(self, now, rate, burst):
+        """
+        Refills the bucket and takes a token from it if there is one
+        :param now: The current time.monotonic() time
+        :param rate: Tokens added each second
+        :param burst: The most tokens the bucket can hold
+        :return: True if a token was taken
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class RateLimiter:
+    """
+    Limits the requests answered for each client subnet and in total. The
+    buckets of the clients are kept in least recently used order so the
+    memory used is bounded by evicting the idle clients first.
+    """
+
+    def __init__(self, client_rate, client_burst, global_rate, max_clients, prefix_v4=32, prefix_v6=64):
+        """
+        Creates a rate limiter, a rate of 0 turns that limit off
+        :param client_rate: Requests each second allowed from each client
+        :param client_burst: Requests a client can send at once after being idle
+        :param global_rate: Requests each second allowed from all clients
+        :param max_clients: The most client buckets that are kept
+        :param prefix_v4: Length of the prefix that groups IPv4 clients
+        :param prefix_v6: Length of the prefix that groups IPv6 clients
+        """
+        self.client_rate = client_rate
+        self.client_burst = max(client_burst, 1.0)
+        self.global_rate = global_rate
+        self.max_clients = max_clients
+        self.shift_v4 = 32 - prefix_v4
+        self.shift_v6 = 128 - prefix_v6
+        # The bucket key of each client address seen, so an address is only
+        # parsed the first time it sends a request
+        self.keys = {}
+        now = time.monotonic()
+        # The global bucket can burst by up to a second of requests
+        self.global_burst = max(global_rate, 1.0)
+        self.global_bucket = TokenBucket(self.global_burst, now)
+        self.buckets = OrderedDict()
+
+    def client_key(self, host):
+        """
+        Finds the subnet a client belongs to, the key is remembered so later
+        requests from the client only cost a dictionary lookup
+        :param host: The address of the client
+        :return: The key of the client's bucket
+        """
+        key = self.keys.get(host)
+        if key is None:
+            if len(self.keys) >= self.max_clients:
+                # Forgetting every address rather than tracking their use
+                self.keys.clear()
+            key = self.keys[host] = self.subnet(host)
+        return key
+
+    def subnet(self, host):
+        """
+        Works out the subnet a client address belongs to
+        :param host: The address of the client
+        :return: The key of the client's bucket, the address itself when the
+        prefix covers the whole address
+        """
+        if host.startswith("::ffff:") and "." in host:
+            # IPv4 client of a dual-stack socket, grouped as IPv4
+            host = host[7:]
+        if ":" in host:
+            host = host.partition("%")[0]
+            if not self.shift_v6:
+                return host
+            return 6, int.from_bytes(soc.inet_pton(soc.AF_INET6, host), "big") >> self.shift_v6
+        if not self.shift_v4:
+            return host
+        return 4, int.from_bytes(soc.inet_aton(host), "big") >> self.shift_v4
+
+    def check(self, address):
+        """
+        Checks if a request may be answered, using a token if it may
+        :param address: The address the request was received from
+        :return: None if the request may be answered, otherwise "client" or
+        "global" for the limit that dropped it
+        """
+        now = time.monotonic()
+        if self.client_rate:
+            host = address[0]
+            key = self.keys.get(host)
+            if key is None:
+                key = self.client_key(host)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.client_burst, now)
+                if len(self.buckets) > self.max_clients:
+                    # Evicting the client that has been idle the longest
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            # Refilling and taking from the bucket in place, as this runs
+            # before every request is decoded
+            tokens = bucket.tokens + (now - bucket.updated) * self.client_rate
+            if tokens > self.client_burst:
+                tokens = self.client_burst
+            bucket.updated = now
+            if tokens < 1.0:
+                bucket.tokens = tokens
+                return "client"
+            bucket.tokens = tokens - 1.0
+        if self.global_rate and not self.global_bucket.take(now, self.global_rate, self.global_burst):
+            return "global"
+        return None
+
+    def charge(self, address, tokens):
+        """
+        Takes extra tokens for a request that check() let through but that
+        costs more than one, as a batch request answering many entries does.
+        The buckets can go below zero, the client is then dropped until they
+        have been refilled.
+        :param address: The address the request was received from
+        :param tokens: The number of extra tokens taken
+        """
+        if self.client_rate:
+            bucket = self.buckets.get(self.client_key(address[0]))
+            if bucket is not None:
+                bucket.tokens -= tokens
+        if self.global_rate:
+            self.global_bucket.tokens -= tokens
+
+
+##################################
+# End of ratelimit.py file
+##################################
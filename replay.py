@@ -0,0 +1,230 @@
+##################################
+# COSC264 Sockets Assignment 2018 - replay.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Usage:
+# python3 replay.py capture host port [port ...] [options]
+# Sends the datagrams of a capture log written by server.py --capture to a
+# server, one port is given for each language in the catalogue, in
+# catalogue order, as for server.py
+# Options:
+#   --speed S        Multiple of the captured rate the datagrams are sent
+#                    at, 0 sends them as fast as possible (default 1.0)
+#   --sockets N      Most client sockets used, each captured client address
+#                    is given its own socket until they run out (default 64)
+#   --languages FILE Language catalogue the server was started with
+#   --output FILE    File the JSON results are written to (default stdout)
+##################################
+
+
+# Importing used modules
+import json
+import socket as soc
+import sys
+import time
+from collections import deque
+from select import select
+from capture import CaptureReader, CaptureError
+from client import split_options
+from languages import DEFAULT_CATALOGUE, CatalogueError, load_catalogue
+from protocol import BATCH_HEADER_LENGTH
+
+
+# Defining the options along with their default values
+DEFAULT_OPTIONS = {"--speed": 1.0, "--sockets": 64, "--languages": DEFAULT_CATALOGUE, "--output": ""}
+USAGE = "Usage: python3 replay.py capture host port [port ...] [options]"
+# Seconds waited for the last responses once every datagram has been sent
+REPLAY_TIMEOUT = 1.0
+# Buffer size is 1526 as this is the size of the biggest packet
+# that can be sent over ethernet
+BUFFER_SIZE = 1526
+# Number of bytes compared between a captured and a replayed response, the
+# magic number, packet type and language code or record count, as the
+# date, time and text change with the time they are replayed at
+COMPARED_LENGTH = BATCH_HEADER_LENGTH
+
+
+def exit_with_error(text):
+    """
+    Outputs an error message along with the usage and exits
+    :param text: The error message
+    """
+    print("*****************************")
+    print(text)
+    print("*****************************")
+    print(USAGE)
+    print("Program will now exit")
+    sys.exit()
+
+
+def process_inputs(args):
+    """
+    Processing the command line arguments
+    :param args: The command line arguments
+    :return: A dictionary holding the value of every option, the path of
+    the capture, the host address and a list of the ports
+    """
+    # Separating the options from the capture, host and ports as the client does
+    options, remaining, text = split_options(args, DEFAULT_OPTIONS)
+    if text:
+        exit_with_error(text)
+    if len(remaining) < 3:
+        exit_with_error("Invalid number of inputs")
+    if options["--speed"] < 0:
+        exit_with_error("Invalid speed, speed can't be negative")
+    if options["--sockets"] < 1:
+        exit_with_error("Invalid number of sockets, at least 1 socket must be used")
+    path, host = remaining[0], remaining[1]
+    try:
+        ports = [int(port) for port in remaining[2:]]
+    except ValueError:
+        exit_with_error("Invalid port type, ports must be integers")
+    if any(port < 1024 or port > 64000 for port in ports):
+        exit_with_error("Invalid port, ports must be in range 1024 to 64000")
+    try:
+        host = soc.getaddrinfo(host, None, soc.AF_UNSPEC, soc.SOCK_DGRAM)[0][4][0]
+    except soc.gaierror:
+        exit_with_error("Invalid hostname or IP address")
+    return options, path, host, ports
+
+
+def receive_responses(sockets, expected, counts):
+    """
+    Receives the responses that have arrived and compares them with the
+    captured responses, the server answers each port in order so a response
+    is matched with the oldest captured response sent from its socket to its port
+    :param sockets: The client sockets
+    :param expected: The start of each captured response still waiting to be
+    matched, in a deque keyed by (socket, server address)
+    :param counts: A dictionary of the counts that are updated
+    """
+    for sock in sockets:
+        while True:
+            try:
+                pkt, address = sock.recvfrom(BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            counts["received"] += 1
+            queue = expected.get((sock, address[:2]))
+            if not queue:
+                counts["unexpected"] += 1
+            elif pkt[:COMPARED_LENGTH] == queue.popleft():
+                counts["matched"] += 1
+            else:
+                counts["mismatched"] += 1
+
+
+def replay(reader, host, ports, options):
+    """
+    Sends every datagram of a capture to the server and compares the responses
+    :param reader: The CaptureReader of the capture
+    :param host: The address of the server
+    :param ports: The ports of the server in catalogue order
+    :param options: A dictionary holding the value of every option
+    :return: A dictionary holding the results of the replay
+    """
+    languages = load_catalogue(options["--languages"])
+    servers = {language.code: (host, port) for language, port in zip(languages, ports)}
+    family = soc.AF_INET6 if ":" in host else soc.AF_INET
+    sockets = []
+    # The socket each captured client address is sent from
+    clients = {}
+    expected = {}
+    counts = dict.fromkeys(["sent", "skipped", "expected", "received", "matched",
+                            "mismatched", "unexpected"], 0)
+    speed = options["--speed"]
+    first = None
+    start = time.monotonic()
+    for record in reader:
+        server = servers.get(record.lang_code)
+        if server is None:
+            # Datagram was received on a port with no language in the catalogue
+            counts["skipped"] += 1
+            continue
+        sock = clients.get(record.address)
+        if sock is None:
+            if len(sockets) < options["--sockets"]:
+                sock = soc.socket(family, soc.SOCK_DGRAM)
+                sock.setblocking(False)
+                sockets.append(sock)
+            else:
+                sock = sockets[len(clients) % len(sockets)]
+            clients[record.address] = sock
+        if first is None:
+            first = record.timestamp
+        if speed:
+            # Waiting until the datagram is due, receiving responses meanwhile
+            due = start + (record.timestamp - first) / speed
+            now = time.monotonic()
+            while now < due:
+                reads, writes, exceps = select(sockets, [], [], due - now)
+                if reads:
+                    receive_responses(reads, expected, counts)
+                now = time.monotonic()
+        while True:
+            try:
+                sock.sendto(record.request, server)
+                break
+            except BlockingIOError:
+                # Send buffer is full, waiting until it has room
+                select([], [sock], [], REPLAY_TIMEOUT)
+        counts["sent"] += 1
+        if len(record.response):
+            counts["expected"] += 1
+            expected.setdefault((sock, server), deque()).append(bytes(record.response[:COMPARED_LENGTH]))
+        if not speed and counts["sent"] % 64 == 0:
+            receive_responses(sockets, expected, counts)
+    # Releasing the last record so the capture can be unmapped
+    record = None
+    sending = time.monotonic() - start
+    # Waiting for the responses still outstanding
+    deadline = time.monotonic() + REPLAY_TIMEOUT
+    while any(expected.values()) and time.monotonic() < deadline:
+        reads, writes, exceps = select(sockets, [], [], max(0.0, deadline - time.monotonic()))
+        receive_responses(reads, expected, counts)
+    elapsed = time.monotonic() - start
+    for sock in sockets:
+        sock.close()
+    counts["missing"] = sum(len(queue) for queue in expected.values())
+    results = dict(counts)
+    results["clients"] = len(clients)
+    results["sockets"] = len(sockets)
+    results["send_seconds"] = sending
+    results["send_rate"] = counts["sent"] / sending if sending else 0.0
+    results["response_rate"] = counts["received"] / elapsed if elapsed else 0.0
+    return results
+
+
+def main():
+    """
+    Replays a capture and outputs the results
+    """
+    options, path, host, ports = process_inputs(sys.argv[1:])
+    try:
+        with CaptureReader(path) as reader:
+            results = replay(reader, host, ports, options)
+    except (CaptureError, CatalogueError) as e:
+        print("*****************************")
+        print(e)
+        print("*****************************")
+        print("Program will now exit")
+        sys.exit()
+    text = json.dumps(results, indent=2)
+    if options["--output"]:
+        with open(options["--output"], "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
+
+
+##################################
+# End of replay.py file
+##################################
@@ -0,0 +1,208 @@
+##################################
+# COSC264 Sockets Assignment 2018 - responsetable.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# A table of finished response packets kept in shared memory, written by
+# the server.py supervisor and read by its workers, so the text of each
+# minute is made once however many workers are run
+##################################
+
+
+# Importing used modules, shared_memory is imported when a table is made as
+# it is slow to import and most servers don't share a table
+import struct
+from protocol import RESPONSE_HEADER_LENGTH, MAX_TEXT_LENGTH
+
+
+# Table header: number of time zones, number of packets in each zone and
+# the size of a slot, followed by the two slots
+HEADER_STRUCT = struct.Struct(">HHI")
+# Each slot starts with its sequence number, odd while the slot is being
+# written, then the minute the slot was written for in each zone. The
+# sequence number is in the host's byte order so it can be read through a
+# memoryview cast, as the table never leaves the host.
+SEQUENCE_STRUCT = struct.Struct("=Q")
+MINUTE_STRUCT = struct.Struct(">HBBBB")
+# Followed by an entry for each packet: zone index, language code, flag
+# holding if it answers a date request, and the offset of the packet in the
+# slot and its length, 0 if the packet couldn't be made. The packets follow.
+ENTRY_STRUCT = struct.Struct(">HHBIH")
+# The longest packet a slot makes room for
+MAX_PACKET = RESPONSE_HEADER_LENGTH + MAX_TEXT_LENGTH
+# Minutes are written to the slot numbered minute % SLOTS, so the next
+# minute can be written while workers still read the current one
+SLOTS = 2
+
+
+class ResponseTable:
+    """
+    Response packets of the current and next minute held in shared memory.
+    Each slot is guarded by a sequence lock, a reader only reads a slot
+    whose sequence number is even and only returns a packet from it while
+    the number is unchanged. Packets are returned as memoryviews of the
+    shared memory and are never copied, so the sequence number isn't
+    checked again once a packet has been returned. A view is only safe to
+    send because the server.py supervisor leaves a slot alone until
+    PUBLISH_DELAY seconds after the minute it held has ended, giving readers
+    that long to send the packets they looked up.
+    """
+
+    def __init__(self, zones, packets):
+        """
+        Creates the shared memory of a table, processes forked afterwards
+        read it through their copy of this object
+        :param zones: The number of time zones
+        :param packets: The number of packets in each zone
+        :raises ValueError: If a slot wouldn't fit in the table's header
+        """
+        from multiprocessing import shared_memory
+        self.zones = zones
+        self.packets = packets
+        entries = SEQUENCE_STRUCT.size + zones * MINUTE_STRUCT.size + zones * packets * ENTRY_STRUCT.size
+        self.slot_size = entries + zones * packets * MAX_PACKET
+        if self.slot_size > 0xFFFFFFFF:
+            raise ValueError("Response table of {0} zones and {1} packets is too large".format(zones, packets))
+        self.memory = shared_memory.SharedMemory(create=True, size=HEADER_STRUCT.size + SLOTS * self.slot_size)
+        self.buf = self.memory.buf
+        HEADER_STRUCT.pack_into(self.buf, 0, zones, packets, self.slot_size)
+        self.offsets = [HEADER_STRUCT.size + slot * self.slot_size for slot in range(SLOTS)]
+        # Views of the sequence number of each slot, read on every lookup
+        self.sequence_views = [self.buf[offset:offset + SEQUENCE_STRUCT.size].cast("Q")
+                               for offset in self.offsets]
+        # The minute number each slot was last written for, kept by the writer
+        self.written = [None] * SLOTS
+        # What a reader found in each slot: the sequence number it was read
+        # at, the minute of each zone and the packets keyed by
+        # (zone, lang_code, request_flag)
+        self.sequences = [None] * SLOTS
+        self.minutes = [{} for slot in range(SLOTS)]
+        self.views = [{} for slot in range(SLOTS)]
+
+    def write(self, number, minutes, packets):
+        """
+        Writes the packets of a minute into its slot
+        :param number: The number of the minute since the epoch, picking the slot
+        :param minutes: A list of the minute tuple of each zone
+        :param packets: A dictionary of the packets keyed by
+        (zone, lang_code, request_flag), None for a packet that couldn't be made
+        """
+        slot = number % SLOTS
+        buf = self.buf
+        offset = self.offsets[slot]
+        sequence = self.sequence_views[slot][0]
+        # An odd sequence number tells readers the slot is being written
+        self.sequence_views[slot][0] = sequence + 1
+        position = offset + SEQUENCE_STRUCT.size
+        for minute in minutes:
+            MINUTE_STRUCT.pack_into(buf, position, *minute)
+            position += MINUTE_STRUCT.size
+        data = position + self.zones * self.packets * ENTRY_STRUCT.size
+        for (zone, lang_code, request_flag), packet in packets.items():
+            length = len(packet) if packet else 0
+            ENTRY_STRUCT.pack_into(buf, position, zone, lang_code, request_flag, data - offset, length)
+            position += ENTRY_STRUCT.size
+            buf[data:data + length] = packet or b""
+            data += length
+        # Marking the unused entries as empty
+        end = offset + SEQUENCE_STRUCT.size + self.zones * MINUTE_STRUCT.size + \
+            self.zones * self.packets * ENTRY_STRUCT.size
+        buf[position:end] = bytes(end - position)
+        self.sequence_views[slot][0] = sequence + 2
+        self.written[slot] = number
+
+    def read(self, slot):
+        """
+        Reads the minutes and the packet views of a slot, the slot is left
+        unread if it is being written
+        :param slot: The index of the slot
+        """
+        buf = self.buf
+        offset = self.offsets[slot]
+        sequence = self.sequence_views[slot][0]
+        self.sequences[slot] = None
+        self.minutes[slot] = {}
+        self.views[slot] = {}
+        if sequence % 2:
+            # Slot is being written, it is read again by the next lookup
+            return
+        position = offset + SEQUENCE_STRUCT.size
+        minutes = {}
+        for zone in range(self.zones):
+            minutes[zone] = MINUTE_STRUCT.unpack_from(buf, position)
+            position += MINUTE_STRUCT.size
+        views = {}
+        for i in range(self.zones * self.packets):
+            zone, lang_code, request_flag, start, length = ENTRY_STRUCT.unpack_from(buf, position)
+            position += ENTRY_STRUCT.size
+            if start:
+                packet = buf[offset + start:offset + start + length] if length else None
+                views[(zone, lang_code, bool(request_flag))] = packet
+        if self.sequence_views[slot][0] == sequence:
+            # Slot wasn't written to while it was read
+            self.sequences[slot] = sequence
+            self.minutes[slot] = minutes
+            self.views[slot] = views
+
+    def lookup(self, minute, zone, lang_code, request_flag):
+        """
+        Finds the packet of a minute, reading the slots again when they
+        have been written since they were last read
+        :param minute: The minute tuple of the zone the packet is wanted for
+        :param zone: The index of the time zone
+        :param lang_code: The language of the packet
+        :param request_flag: Flag holding if the packet answers a date request
+        :return: A memoryview of the packet, None if the table doesn't hold
+        the minute or the packet couldn't be made
+        """
+        key = (zone, lang_code, request_flag)
+        for slot in range(SLOTS):
+            if self.minutes[slot].get(zone) == minute and self.sequence_views[slot][0] == self.sequences[slot]:
+                return self.views[slot].get(key)
+        changed = False
+        for slot in range(SLOTS):
+            if self.sequence_views[slot][0] != self.sequences[slot]:
+                self.read(slot)
+                changed = True
+        if changed:
+            for slot in range(SLOTS):
+                if self.minutes[slot].get(zone) == minute:
+                    return self.views[slot].get(key)
+        return None
+
+    def close(self, unlink=True):
+        """
+        Releases the views of the table and closes its shared memory, the
+        writer must have stopped first
+        :param unlink: Flag holding if the shared memory is freed, only the
+        process that created the table frees it
+        """
+        for slot in range(SLOTS):
+            # Releasing the packet views so the memory can be closed, even
+            # if a caller still holds one
+            for view in self.views[slot].values():
+                if view is not None:
+                    view.release()
+            self.sequences[slot] = None
+            self.minutes[slot] = {}
+            self.views[slot] = {}
+        for view in self.sequence_views:
+            view.release()
+        self.buf = None
+        if unlink:
+            # Freed first so a view still held elsewhere can't leak the memory
+            self.memory.unlink()
+        try:
+            self.memory.close()
+        except BufferError:
+            # A view made before the slot was last read is still held, the
+            # mapping then lasts until the process exits
+            pass
+
+
+##################################
+# End of responsetable.py file
+##################################
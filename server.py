@@ -8,49 +8,249 @@
 
 ##################################
 # Usage:
-# python3 server.py English_port Maori_port German_port
+# python3 server.py [options] port[@zone] [port[@zone] ...]
+# One port is given for each language in the catalogue, in catalogue order,
+# for the default catalogue these are the English, Maori and German ports.
+# A port can be followed by the IANA time zone it answers in, by default
+# the host's own zone is used
+# Options:
+#   --batch N    Most datagrams read from a socket each time it is ready (default 1)
+#   --workers N  Number of worker processes sharing the ports (default 1)
+#   --shared-table  The supervisor makes the response packets of each minute
+#                   once in shared memory and the workers send them from there
+#   --engine E   Server engine used, either select or asyncio (default select),
+#                the select engine uses the platform's best selector, epoll on Linux
+#   --log-level L  Lowest level logged, debug logs every packet (default info)
+#   --summary S  Seconds between request rate summaries (default 10.0)
+#   --quiet      Nothing is logged while requests are being served
+#   --languages FILE  Language catalogue to load (default languages.json)
+#   --client-rate R   Requests per second answered for each client subnet (default off)
+#   --client-burst B  Requests a client subnet can send at once (default 20.0)
+#   --client-prefix N Prefix length grouping IPv4 clients into subnets (default 32)
+#   --global-rate R   Requests per second answered in total (default off)
+#   --max-clients N   Most client subnets tracked at once (default 65536)
+#   --zones Z1,Z2,...  Time zones that can be picked by requests, the high
+#                      byte of the request type picks zone N (default none)
+#   --stats-port P  Serves Prometheus metrics on localhost:P, worker N uses P+N (default off)
+#   --bind A1,A2,...  Addresses the ports are opened on, each gets its own
+#                     sockets (default every IPv4 and IPv6 address)
+#   --rcvbuf N   Size in bytes of each socket's receive buffer (default kernel default)
+#   --sndbuf N   Size in bytes of each socket's send buffer (default kernel default)
+#   --handoff PATH  Unix socket a new server takes the ports over through, a
+#                   server started with the same PATH takes over the sockets of
+#                   the running server, which then drains and stops (default off)
+#   --capture FILE  Writes every received datagram and its response to a
+#                   capture log for replay.py, worker N writes FILE.N (default off)
+# Sending SIGUSR1 turns profiling on and off, SIGHUP reloads the language
+# catalogue and time zones and reopens the capture log, and SIGTERM answers
+# the requests already queued and then stops the server
 ##################################
 
 
-# Importing used modules
-import datetime
+# Importing used modules, time is imported first so the startup time
+# logged includes importing the others
+import time
+IMPORT_BEGAN = time.perf_counter()
+import logging
+import logging.handlers
+import os
+import queue
+import selectors
+import signal
 import socket as soc
+import struct
 import sys
-from select import select
+import threading
+from languages import DEFAULT_CATALOGUE, CatalogueError, load_catalogue
+from metrics import Metrics, ProfileToggle, start_endpoint
+from ratelimit import RateLimiter
+from capture import CaptureWriter
+from responsetable import ResponseTable, SLOTS
+from handoff import HANDOFF_TIMEOUT, HandoffError, HandoffListener, take_over, accept
+from timezones import ZoneClock, ZoneError, reload_zone_data
+from clock import SYSTEM_CLOCK, FakeClock
+from protocol import (DATE_REQUEST, TIME_REQUEST, REQUEST_LENGTH, MAX_TEXT_LENGTH,
+                      REQUEST_TYPE_MASK, ZONE_SHIFT, BATCH_REQUEST_PACKET, BATCH_HEADER_LENGTH,
+                      BATCH_ENTRY_LENGTH, MAX_BATCH, RECORD_OFFSET, HEADER_LENGTH, MAGIC_BYTES,
+                      REQUEST_HEADER, BATCH_REQUEST_HEADER, BATCH_STRUCT, pack_request,
+                      unpack_request, pack_response, unpack_batch_request, pack_batch_response)
 
 
-# Defining constants
-MAGIC_NUMBER = 0x497E
-REQUEST_PACKET = 0x0001
-RESPONSE_PACKET = 0x0002
-DATE_REQUEST = 0x0001
-TIME_REQUEST = 0x0002
-ENGLISH_CODE = 0x0001
-MAORI_CODE = 0x0002
-GERMAN_CODE = 0x0003
+# Defining the optional command line flags along with their default values,
+# flags with a boolean default don't take a value
+DEFAULT_OPTIONS = {"--batch": 1, "--workers": 1, "--engine": "select", "--log-level": "info",
+                   "--summary": 10.0, "--quiet": False, "--stats-port": 0,
+                   "--languages": DEFAULT_CATALOGUE, "--client-rate": 0.0, "--client-burst": 20.0,
+                   "--client-prefix": 32, "--global-rate": 0.0, "--max-clients": 65536,
+                   "--zones": "", "--capture": "", "--rcvbuf": 0, "--sndbuf": 0, "--bind": "",
+                   "--handoff": "", "--shared-table": False}
+ENGINES = ["select", "asyncio"]
+LOG_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+USAGE = "Usage: python3 server.py [options] port[@zone] [port[@zone] ...], with one port for each language"
+# Buffer size is 1526 as this is the size of the biggest packet
+# that can be sent over ethernet
+BUFFER_SIZE = 1526
+# Seconds after a minute starts that the supervisor writes the packets of
+# the next minute into the shared table, leaving workers time to finish
+# with the slot it overwrites
+PUBLISH_DELAY = 1.0
+# Socket option that makes Linux attach the number of datagrams it has
+# dropped on a socket to each datagram received, Python doesn't define it
+SO_RXQ_OVFL = getattr(soc, "SO_RXQ_OVFL", 40 if sys.platform.startswith("linux") else None)
+DROPS_STRUCT = struct.Struct("=I")
+DROPS_ANCILLARY_SIZE = soc.CMSG_SPACE(DROPS_STRUCT.size)
+# Most seconds spent answering queued requests once the server is stopping
+DRAIN_TIMEOUT = 1.0
+# Largest socket buffer size that can be asked for, setsockopt() takes a C int
+MAX_BUFFER = 2 ** 31 - 1
 
 
-# Defining the months of the year in all three languages
-english_months = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
-                  "October", "November", "December"]
-maori_months = ["Kohitātea", "Hui-tanguru", "Poutū-te-rangi", "Paenga-whāwhā", "Haratua", "Pipiri",
-                "Hōngongoi", "Here-turi-kōkā", "Mahuru", "Whiringa-ā-nuku", "Whiringa-ā-rangi", "Hakihea"]
-german_months = ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli", "August", "September",
-                 "Oktober", "November", "Dezember"]
+# The languages served, in catalogue order, and each language and its name
+# keyed by language code, these are filled by load_languages()
+LANGUAGE_LIST = []
+LANGUAGES = {}
+LANGUAGE_NAMES = {}
+# The language code of each socket keyed by its file descriptor
+socket_languages = {}
+# The clock the time is read from, set_clock() replaces it in tests and benchmarks
+clock = SYSTEM_CLOCK
+# The time zones responses can be made in, zone 0 is the host's own zone and
+# the others come from --zones and the ports, these are filled by load_zones()
+ZONE_LIST = [ZoneClock()]
+# The index of the zone of each port in catalogue order, and of each
+# socket keyed by its file descriptor
+port_zones = []
+socket_zones = {}
 
 
-def get_time():
+# Logger used while serving requests, records are written to stdout by a
+# background thread so the server never blocks on output
+log = logging.getLogger("server")
+log_listener = None
+# Counts of the requests handled since the last summary was logged,
+# this is None when the server is quiet
+summary = None
+# Counters and histograms of the packets handled by this process
+stats = Metrics(LANGUAGE_NAMES)
+# Limits the requests answered for each client, None when there are no limits
+limiter = None
+# Writes the received datagrams to a capture log, None when not capturing
+capture = None
+# Response packets shared by the workers, None when --shared-table isn't given
+response_table = None
+# Wakes the supervisor's thread writing the shared table when it is reloaded
+# or stopped, the thread runs until table_stopping is set
+table_wakeup = threading.Event()
+table_stopping = False
+publisher = None
+# Flag holding if the kernel reports its drop counts on the server's sockets
+track_drops = False
+# Set by the signal handlers, the serving loop acts on them once it wakes
+stop_requested = False
+reload_requested = False
+# Options the server was started with, used again when it is reloaded
+running_options = None
+# Listens for a new server taking over the sockets, None when not enabled
+handoff_listener = None
+handed_over = False
+# The perf_counter() time the server started loading at, used to log the
+# startup time, a worker counts from when it was forked
+startup_began = None
+
+
+# Cache of finished response packets keyed by zone index, each entry holds
+# the minute the packets were made for and the packets keyed by
+# (lang_code, request_flag), an entry is rebuilt when its minute has passed
+response_cache = {}
+# Every valid request packet, these are the requests for the host's zone
+# until set_valid_requests() is called as the zones are loaded
+valid_requests = {pack_request(DATE_REQUEST), pack_request(TIME_REQUEST)}
+
+
+def get_time(zone=0):
+    """
+    Getting the current date and time in a time zone, the same tuple is
+    returned for the whole minute so only the clock is read for each request
+    :param zone: The index of the time zone
+    :return: A tuple holding the current date and time
+    """
+    return ZONE_LIST[zone].now()
+
+
+def set_clock(new_clock):
+    """
+    Replaces the clock the time is read from, such as with a FakeClock
+    :param new_clock: The clock to read the time from
+    """
+    global clock
+    clock = new_clock
+    ZONE_LIST[:] = [ZoneClock(zone.name, clock) for zone in ZONE_LIST]
+    response_cache.clear()
+
+
+def load_zones(names, port_names):
+    """
+    Loads the time zones that responses can be made in
+    :param names: Comma separated names of the zones that can be picked by requests
+    :param port_names: The name of the zone of each port, None for the host's zone
+    """
+    zones = [name for name in names.split(",") if name]
+    for name in port_names:
+        if name and name not in zones:
+            zones.append(name)
+    try:
+        ZONE_LIST[1:] = [ZoneClock(name, clock) for name in zones]
+    except ZoneError as e:
+        print("*****************************")
+        print(e)
+        print("*****************************")
+        print("Program will now exit")
+        sys.exit()
+    port_zones[:] = [zones.index(name) + 1 if name else 0 for name in port_names]
+    response_cache.clear()
+    set_valid_requests()
+
+
+def set_valid_requests():
+    """
+    Packs every valid request packet, a date or time request in each of the
+    loaded time zones, so decode_packet() can accept them with a set lookup
+    """
+    valid_requests.clear()
+    for zone in range(len(ZONE_LIST)):
+        for request_type in (DATE_REQUEST, TIME_REQUEST):
+            valid_requests.add(pack_request(request_type, zone))
+
+
+def load_languages(path):
+    """
+    Loads the language catalogue, the server serves one port for each language
+    :param path: The path of the catalogue file
+    """
+    try:
+        languages = load_catalogue(path)
+    except CatalogueError as e:
+        print("*****************************")
+        print(e)
+        print("*****************************")
+        print("Program will now exit")
+        sys.exit()
+    set_languages(languages)
+
+
+def set_languages(languages):
     """
-    Getting the current date and time through a system call
-    :return: A list holding the current date and time
+    Replaces the languages served
+    :param languages: A list of the Languages in catalogue order
     """
-    time = datetime.datetime.now()
-    year = time.year
-    month = time.month
-    day = time.day
-    hour = time.hour
-    minute = time.minute
-    return [year, month, day, hour, minute]
+    # The dictionaries are updated in place as they are shared with the metrics
+    LANGUAGE_LIST[:] = languages
+    LANGUAGES.clear()
+    LANGUAGE_NAMES.clear()
+    for language in languages:
+        LANGUAGES[language.code] = language
+        LANGUAGE_NAMES[language.code] = language.name
+    response_cache.clear()
 
 
 def textual_date(year, month, day, lang_code):
@@ -62,13 +262,7 @@ def textual_date(year, month, day, lang_code):
     :param lang_code: The code fo the language that the text needs to be in
     :return: The textual representation of the date
     """
-    if lang_code == ENGLISH_CODE:
-        date_text = "Today's date is {0} {1}, {2}".format(english_months[month-1], day, year)
-    elif lang_code == MAORI_CODE:
-        date_text = "Ko te ra o tenei ra ko {0} {1}, {2}".format(maori_months[month-1], day, year)
-    else:
-        date_text = "Heute ist der {0}. {1} {2}".format(day, german_months[month-1], year)
-    return date_text
+    return LANGUAGES[lang_code].date_text(year, month, day)
 
 
 def textual_time(hour, minute, lang_code):
@@ -79,93 +273,297 @@ def textual_time(hour, minute, lang_code):
     :param lang_code: The code fo the language that the text needs to be in
     :return: The textual representation of the time
     """
-    # If-Else structure is used below for when the minute is between 0 and 9,
-    # When this is true a leading zero is added to the minute field
-    if lang_code == ENGLISH_CODE:
-        if minute < 10:
-            time_text = "The current time is {0}:0{1}".format(hour, minute)
-        else:
-            time_text = "The current time is {0}:{1}".format(hour, minute)
-    elif lang_code == MAORI_CODE:
-        if minute < 10:
-            time_text = "Ko te wa o tenei wa {0}:0{1}".format(hour, minute)
-        else:
-            time_text = "Ko te wa o tenei wa {0}:{1}".format(hour, minute)
-    else:
-        if minute < 10:
-            time_text = "Die Uhrzeit ist {0}:0{1}".format(hour, minute)
+    return LANGUAGES[lang_code].time_text(hour, minute)
+
+
+def process_options(args):
+    """
+    Separates the optional flags from the port numbers in the command line arguments
+    :param args: The command line arguments
+    :return: A dictionary holding the value of every option and a list of
+    the remaining arguments
+    """
+    text = None
+    options = dict(DEFAULT_OPTIONS)
+    remaining = []
+    index = 0
+    while index < len(args) and not text:
+        arg = args[index]
+        if not arg.startswith("--"):
+            # Argument is a port number so it is left for process_ports()
+            remaining.append(arg)
+            index += 1
+        elif arg not in DEFAULT_OPTIONS:
+            text = "Unknown option {0}".format(arg)
+        elif isinstance(DEFAULT_OPTIONS[arg], bool):
+            # Flag is a switch that doesn't take a value
+            options[arg] = True
+            index += 1
+        elif index + 1 >= len(args):
+            text = "No value given for option {0}".format(arg)
         else:
-            time_text = "Die Uhrzeit ist {0}:{1}".format(hour, minute)
-    return time_text
+            # Converting the value to the same type as the default value
+            try:
+                options[arg] = type(DEFAULT_OPTIONS[arg])(args[index + 1])
+            except ValueError:
+                text = "Invalid value for option {0}".format(arg)
+            index += 2
+    if not text and options["--batch"] < 1:
+        text = "Invalid batch size, batch size must be at least 1"
+    elif not text and options["--engine"] not in ENGINES:
+        text = "Invalid engine, engine must be either 'select' or 'asyncio'"
+    elif not text and options["--log-level"] not in LOG_LEVELS:
+        text = "Invalid log level, level must be one of {0}".format(", ".join(LOG_LEVELS))
+    elif not text and options["--summary"] <= 0:
+        text = "Invalid summary interval, interval must be greater than 0"
+    elif not text and options["--stats-port"] and not 1024 <= options["--stats-port"] <= 64000:
+        text = "Invalid stats port, port must range from 1024 to 64000"
+    elif not text and (options["--client-rate"] < 0 or options["--global-rate"] < 0):
+        text = "Invalid rate, rates can't be negative"
+    elif not text and not 0 <= options["--client-prefix"] <= 32:
+        text = "Invalid client prefix, prefix must range from 0 to 32"
+    elif not text and options["--max-clients"] < 1:
+        text = "Invalid number of clients, at least 1 client must be tracked"
+    elif not text and not (0 <= options["--rcvbuf"] <= MAX_BUFFER and 0 <= options["--sndbuf"] <= MAX_BUFFER):
+        text = "Invalid buffer size, buffer sizes must range from 0 to {0} bytes".format(MAX_BUFFER)
+    elif not text and process_bind(options["--bind"]) is None:
+        text = "Invalid bind address, addresses must be IPv4 or IPv6 addresses separated by commas"
+    elif not text and options["--workers"] < 1:
+        text = "Invalid number of workers, there must be at least 1 worker"
+    elif not text and options["--handoff"] and options["--workers"] > 1:
+        text = "Socket handoff needs the server to run as a single process"
+    elif not text and options["--handoff"] and not hasattr(soc, "send_fds"):
+        text = "Socket handoff is not supported on this platform"
+    elif not text and options["--shared-table"] and options["--workers"] < 2:
+        text = "A shared response table needs more than one worker"
+    elif not text and options["--workers"] > 1 and not hasattr(soc, "SO_REUSEPORT"):
+        text = "Multiple workers are not supported on this platform"
+    if text:
+        # Options entered are invalid, an error message is output
+        # along with instructions on how to use the server
+        print("*****************************")
+        print(text)
+        print("*****************************")
+        print(USAGE)
+        print("Program will now exit")
+        sys.exit()
+    return options, remaining
+
+
+def process_bind(text):
+    """
+    Processes the addresses given to --bind
+    :param text: Comma separated IPv4 and IPv6 addresses, empty for every address
+    :return: A list of the addresses, "" standing for every address, None
+    if an address is invalid
+    """
+    addresses = [address.strip() for address in text.split(",") if address.strip()]
+    for address in addresses:
+        try:
+            if ":" in address:
+                # Link-local addresses can be followed by their scope, as fe80::1%eth0
+                soc.inet_pton(soc.AF_INET6, address.partition("%")[0])
+            else:
+                soc.inet_pton(soc.AF_INET, address)
+        except OSError:
+            return None
+    return addresses or [""]
 
 
 def process_ports(args):
     """
-    Processes the command line arguments to get the three port numbers to
-    be used with the three UDP sockets
+    Processes the command line arguments to get the port number to be used
+    with the UDP socket of each language
     :param args: The command line arguments
-    :return: A list of the tree port numbers
+    :return: A list of the port numbers and a list of the time zone name of
+    each port, None where no zone was given, in catalogue order
     """
     text = None
+    ports = []
+    # Separating the time zones from the ports
+    zones = [arg.partition("@")[2] or None for arg in args]
     # Checking the correct number of arguments was passed
-    if len(args) != 3:
-        text = "Invalid number of ports entered"
+    if len(args) != len(LANGUAGE_LIST):
+        text = "Invalid number of ports entered, {0} languages need {0} ports".format(len(LANGUAGE_LIST))
     else:
         # Checking that the ports passed are all ints
         try:
-            a, b, c = int(args[0]), int(args[1]), int(args[2])
+            ports = [int(arg.partition("@")[0]) for arg in args]
         except ValueError:
             text = "Invalid port type"
         # Checking that the ports are in the correct range
-        for port in [a, b, c]:
+        for port in ports:
             if port < 1024 or port > 64000:
                 text = "Invalid ports, ports must range from 1024 to 64000"
         # Checking that the ports are all unique
-        if a == b or a == c or b == c:
+        if len(set(ports)) != len(ports):
             text = "Invalid ports, ports must be unique"
     if not text:
         # Ports entered are valid server will now wait for requests
         print("-----------------------------")
         print("-----------------------------")
-        print("Port number {0} for text in English".format(a))
-        print("Port number {0} for text in Maori".format(b))
-        print("Port number {0} for text in German".format(c))
+        for port, language, zone in zip(ports, LANGUAGE_LIST, zones):
+            if zone:
+                print("Port number {0} for text in {1} in the {2} time zone".format(port, language.name, zone))
+            else:
+                print("Port number {0} for text in {1}".format(port, language.name))
         print("-----------------------------")
-        return [a, b, c]
+        return ports, zones
     else:
         # Ports entered are invalid, an error message is output
         # along with instructions on how to use the server
         print("*****************************")
         print(text)
         print("*****************************")
-        print("Usage: python3 server.py English_port Maori_port German_port")
+        print(USAGE)
         print("Program will now exit")
         sys.exit()
 
 
+class RequestSummary:
+    """
+    Counts the requests handled by the server and logs them as a summary of
+    requests per second for each language, rather than logging every packet
+    """
+
+    def __init__(self, interval):
+        """
+        Creates an empty summary
+        :param interval: Seconds between each summary being logged
+        """
+        self.interval = interval
+        self.counts = dict.fromkeys(LANGUAGE_NAMES, 0)
+        self.invalid = 0
+        self.drops = 0
+        self.started = time.monotonic()
+
+    def add(self, lang_code):
+        """
+        Counts a valid request, logging the summary once it is due
+        :param lang_code: The language of the request
+        """
+        self.counts[lang_code] += 1
+        self.log_if_due()
+
+    def add_invalid(self):
+        """
+        Counts an invalid request, logging the summary once it is due
+        """
+        self.invalid += 1
+        self.log_if_due()
+
+    def log_if_due(self):
+        """
+        Logs the request rates and starts a new summary once the interval has passed
+        """
+        now = time.monotonic()
+        elapsed = now - self.started
+        if elapsed < self.interval:
+            return
+        rates = ", ".join("{0} {1:.1f}".format(LANGUAGE_NAMES[code], count / elapsed)
+                          for code, count in self.counts.items())
+        log.info("Requests/sec: %s, invalid %.1f", rates, self.invalid / elapsed)
+        drops = sum(stats.kernel_drops.values())
+        if drops != self.drops:
+            # The kernel's counts only grow, so any change is new packet loss
+            log.warning("Kernel dropped %d datagrams as receive buffers were full, --rcvbuf may need raising",
+                        drops - self.drops)
+            self.drops = drops
+        for code in self.counts:
+            self.counts[code] = 0
+        self.invalid = 0
+        self.started = now
+
+
+def setup_logging(options):
+    """
+    Sends the server's log records through a queue to a background thread
+    that writes them to stdout, replacing any handler set up before
+    :param options: A dictionary holding the value of every option
+    """
+    global log_listener, summary
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    log.handlers.clear()
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.propagate = False
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    log_listener = logging.handlers.QueueListener(log_queue, handler)
+    log_listener.start()
+    if options["--quiet"]:
+        # Nothing is logged or counted while requests are being served
+        log.setLevel(logging.CRITICAL + 1)
+        summary = None
+    else:
+        log.setLevel(LOG_LEVELS[options["--log-level"]])
+        summary = RequestSummary(options["--summary"])
+
+
+def stop_logging():
+    """
+    Writes out any queued log records and stops the background thread
+    """
+    global log_listener
+    if log_listener:
+        log_listener.stop()
+        log_listener = None
+
+
 def decode_packet(pkt):
     """
     Checking that the received request packet is valid
     :param pkt: The received packet
     :return: 0 if the packet is valid, 1 if the packet is invalid
     """
-    text = None
-    # Checking if any of the packet fields are invalid
-    if len(pkt) != 6: text = "Packet is of invalid length"
-    elif ((pkt[0] << 8) + pkt[1]) != MAGIC_NUMBER: text = "Magic number is invalid,"
-    elif ((pkt[2] << 8) + pkt[3]) != REQUEST_PACKET: text = "Packet type invalid"
-    elif ((pkt[4] << 8) + pkt[5]) not in [TIME_REQUEST, DATE_REQUEST]: text = "Request type invalid"
+    # A valid request is one of a few known packets, so it is found with a
+    # single set lookup and none of its fields are unpacked
+    data = bytes(pkt)
+    if data in valid_requests:
+        return 0
+    # Checking the header first, junk is rejected here without being unpacked
+    header = data[:HEADER_LENGTH]
+    if len(data) < REQUEST_LENGTH: text, reason = "Packet is of invalid length", "length"
+    elif header == BATCH_REQUEST_HEADER: text, reason = check_batch(pkt, BATCH_STRUCT.unpack_from(pkt)[2])
+    elif header[:2] != MAGIC_BYTES: text, reason = "Magic number is invalid,", "magic_number"
+    elif header != REQUEST_HEADER: text, reason = "Packet type invalid", "packet_type"
+    elif len(data) != REQUEST_LENGTH: text, reason = "Packet is of invalid length", "length"
+    elif unpack_request(data).request_type & REQUEST_TYPE_MASK not in [TIME_REQUEST, DATE_REQUEST]:
+        text, reason = "Request type invalid", "request_type"
+    else:
+        text, reason = "Time zone invalid", "zone"
     if text:
-        # Outputting error message as the packet is invalid
-        print("*****************************")
-        print("{0}, packet will be discarded".format(text))
-        print("*****************************")
+        # Logging error message as the packet is invalid
+        stats.count_invalid(reason)
+        log.debug("%s, packet will be discarded", text)
         return 1
     else:
         # Returning 0 as the packet is valid and processing can continue
         return 0
 
 
+def check_batch(pkt, count):
+    """
+    Checking that the entries of a batch request packet are valid
+    :param pkt: The received packet
+    :param count: The count field of the packet
+    :return: The error found in the packet and the reason it is counted
+    under, both None if the packet is valid
+    """
+    if count < 1 or count > MAX_BATCH:
+        return "Batch count invalid", "batch_count"
+    if len(pkt) != BATCH_HEADER_LENGTH + count * BATCH_ENTRY_LENGTH:
+        return "Packet is of invalid length", "length"
+    for lang_code, request_type in unpack_batch_request(pkt):
+        if lang_code not in LANGUAGES:
+            return "Language code invalid", "language"
+        if request_type & REQUEST_TYPE_MASK not in [TIME_REQUEST, DATE_REQUEST]:
+            return "Request type invalid", "request_type"
+        if request_type >> ZONE_SHIFT >= len(ZONE_LIST):
+            return "Time zone invalid", "zone"
+    return None, None
+
+
 def get_lang(sock, sockets):
     """
     Finds out which language the client wants the textual field in
@@ -173,46 +571,47 @@ def get_lang(sock, sockets):
     :param sockets: A list of all the sockets opened by the server
     :return: The language code corresponding to the language that the client wants
     """
-    if sock == sockets[0]:
-        return ENGLISH_CODE
-    elif sock == sockets[1]:
-        return MAORI_CODE
-    else:
-        return GERMAN_CODE
+    return socket_languages[sock.fileno()]
 
 
-def handle_packet(pkt, lang_code):
+def handle_packet(pkt, lang_code, zone=0):
     """
     Finds out the request type of the received packet
     :param pkt: The received packet
     :param lang_code: The language that the client wants the textual
     field in
+    :param zone: The index of the time zone of the port the packet was received on
     :return: The response packet ready to be sent made by using makeResponse()
     """
-    # Getting the request type of the packet
-    request = (pkt[4] << 8) + pkt[5]
-    if request == 0x0001:
-        return make_response(True, lang_code)
-    elif request == 0x0002:
-        return make_response(False, lang_code)
+    packet = unpack_request(pkt)
+    # Batch requests give the language of each of their entries
+    if packet.packet_type == BATCH_REQUEST_PACKET:
+        return make_batch_response(pkt, zone)
+    # Getting the request type of the packet, its high byte picks a time zone
+    request_type = packet.request_type
+    request = request_type & REQUEST_TYPE_MASK
+    if request_type >> ZONE_SHIFT:
+        zone = request_type >> ZONE_SHIFT
+    if request == DATE_REQUEST:
+        return make_response(True, lang_code, zone)
+    elif request == TIME_REQUEST:
+        return make_response(False, lang_code, zone)
     else:
-        # Output error message as request type is invalid
-        print("*****************************")
-        print("Invalid request type, packet will be discarded")
-        print("*****************************")
+        # Logging error message as request type is invalid
+        log.debug("Invalid request type, packet will be discarded")
         return None
 
 
-def make_response(request_flag, lang_code):
+def build_response(time, request_flag, lang_code):
     """
-    Makes a response packet using the passed parameters
+    Builds a response packet for the passed time using the passed parameters
+    :param time: A list holding the date and time the packet is made for
     :param request_flag: Flag holding if the client wants the date or time
     :param lang_code: Holds the language that the client wants to receive the
     textual field in
-    :return: The response packet ready to be sent
+    :return: The response packet as immutable bytes, None if it can't be made
     """
     # Getting the textual component of the response
-    time = get_time()
     if request_flag:
         text = textual_date(time[0], time[1], time[2], lang_code)
     else:
@@ -221,109 +620,977 @@ def make_response(request_flag, lang_code):
     encoded_text = text.encode('utf-8')
     text_length = len(encoded_text)
     # Checking encoded text is of an allowed length
-    if text_length > 255:
-        print("Textual field to long, packet will be discarded")
+    if text_length > MAX_TEXT_LENGTH:
+        log.error("Textual field to long, packet will be discarded")
         return None
-    # Outputting data of the request packet
-    request = "time"
-    if request_flag: request = "date"
-    lang = "English"
-    if lang_code == MAORI_CODE: lang = "Maori"
-    elif lang_code == GERMAN_CODE: lang = "German"
-    print("-----\nClient requested the {0} in {1}".format(request, lang))
-    print("-----")
-    # Creating and filling the response packet
-    response = bytearray(13 + len(encoded_text))
-    response[0:2] = MAGIC_NUMBER.to_bytes(2, "big", signed=False)
-    response[2:4] = RESPONSE_PACKET.to_bytes(2, "big", signed=False)
-    response[4:6] = lang_code.to_bytes(2, "big", signed=False)
-    response[6:8] = time[0].to_bytes(2, "big", signed=False)
-    response[8] = time[1]
-    response[9] = time[2]
-    response[10] = time[3]
-    response[11] = time[4]
-    response[12] = text_length
-    # Adding the text to the end of the packet
-    index = 13
-    for i in encoded_text:
-        response[index] = i
-        index += 1
+    # Returning the packet as bytes so it can be shared between requests
+    return pack_response(lang_code, time, encoded_text)
+
+
+def refresh_cache(time, zone=0):
+    """
+    Rebuilds every cached response packet of a time zone for the passed minute
+    :param time: A list holding the date and time the packets are made for
+    :param zone: The index of the time zone
+    :return: The new cache entry of the zone
+    """
+    packets = {}
+    for lang_code in LANGUAGES:
+        for request_flag in (True, False):
+            packets[(lang_code, request_flag)] = build_response(time, request_flag, lang_code)
+    response_cache[zone] = (time, packets)
+    return response_cache[zone]
+
+
+def make_response(request_flag, lang_code, zone=0):
+    """
+    Gets the response packet for the passed parameters, the packets are only
+    rebuilt once the minute they were made for has passed
+    :param request_flag: Flag holding if the client wants the date or time
+    :param lang_code: Holds the language that the client wants to receive the
+    textual field in
+    :param zone: The index of the time zone the response is made in
+    :return: The response packet ready to be sent
+    """
+    time = get_time(zone)
+    packet = None
+    if response_table:
+        # Sending the packet the supervisor made, from the shared memory
+        packet = response_table.lookup(time, zone, lang_code, request_flag)
+    if packet is None:
+        # Rebuilding all the zone's packets when the minute rolls over
+        cached = response_cache.get(zone)
+        if cached is None or cached[0] != time:
+            cached = refresh_cache(time, zone)
+        packet = cached[1][(lang_code, request_flag)]
+    stats.count_request(lang_code, request_flag)
+    # Logging data of the request packet
+    if log.isEnabledFor(logging.DEBUG):
+        request = "time"
+        if request_flag: request = "date"
+        log.debug("Client requested the %s in %s", request, LANGUAGE_NAMES[lang_code])
     # Returning the packet to be sent
-    return response
+    return packet
+
+
+def make_batch_response(pkt, zone=0):
+    """
+    Makes the response to a batch request, each record is sliced from the
+    cached response packet. Records are added in the order they were asked
+    for, stopping at the first that can't be made or doesn't fit in a datagram.
+    :param pkt: The received batch request packet, already checked
+    :param zone: The index of the time zone of the port the packet was received on
+    :return: The batch response packet ready to be sent, None if no record
+    can be made
+    """
+    records = []
+    length = BATCH_HEADER_LENGTH
+    for lang_code, request_type in unpack_batch_request(pkt):
+        entry_zone = request_type >> ZONE_SHIFT or zone
+        response = make_response(request_type & REQUEST_TYPE_MASK == DATE_REQUEST, lang_code, entry_zone)
+        if response is None or length + len(response) - RECORD_OFFSET > BUFFER_SIZE:
+            break
+        records.append(response[RECORD_OFFSET:])
+        length += len(response) - RECORD_OFFSET
+    if not records:
+        return None
+    return pack_batch_response(records)
+
+
+def open_socket(address):
+    """
+    Opens a UDP socket for an address given to --bind
+    :param address: The address, "" for every address
+    :return: The socket and the address it is bound to
+    """
+    if address == "" and soc.has_dualstack_ipv6():
+        # One dual-stack socket answers both IPv4 and IPv6 clients
+        sock = soc.socket(soc.AF_INET6, soc.SOCK_DGRAM)
+        sock.setsockopt(soc.IPPROTO_IPV6, soc.IPV6_V6ONLY, 0)
+        return sock, "::"
+    if ":" in address:
+        # Explicit IPv6 addresses only answer IPv6 so they can be bound
+        # alongside IPv4 addresses on the same ports
+        sock = soc.socket(soc.AF_INET6, soc.SOCK_DGRAM)
+        sock.setsockopt(soc.IPPROTO_IPV6, soc.IPV6_V6ONLY, 1)
+        return sock, address
+    return soc.socket(soc.AF_INET, soc.SOCK_DGRAM), address
 
 
-def create_sockets(english_port, maori_port, german_port):
+def create_sockets(ports, reuse_port=False, addresses=("",)):
     """
-    Opens three UDP sockets and binds them tto the three ports passed
-    :param english_port: Port number to be bound to the socket used to get
-    a textual representation in English
-    :param maori_port: Port number to be bound to the socket used to get
-    a textual representation in Maori
-    :param german_port: Port number to be bound to the socket used to get
-    a textual representation in German
-    :return: A list of the three UDP sockets use by the server
+    Opens a group of UDP sockets, one for each language, on each address and
+    binds them to the ports passed
+    :param ports: The port number to be bound to the socket of each
+    language, in catalogue order
+    :param reuse_port: Flag holding if SO_REUSEPORT is set so that the
+    ports can be shared by several worker processes
+    :param addresses: The addresses a group of sockets is opened on, ""
+    for every address
+    :return: A list of the UDP sockets used by the server, grouped by address
     """
-    # Opening three UDP sockets
-    english_socket = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
-    maori_socket = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
-    german_socket = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    sockets = []
     try:
-        # Binding the three sockets to their ports
-        english_socket.bind(('', english_port))
-        maori_socket.bind(('', maori_port))
-        german_socket.bind(('', german_port))
+        for address in addresses:
+            # Opening a UDP socket for each language
+            for port in ports:
+                sock, host = open_socket(address)
+                sockets.append(sock)
+                if reuse_port:
+                    # Letting the kernel spread the datagrams across every worker's sockets
+                    sock.setsockopt(soc.SOL_SOCKET, soc.SO_REUSEPORT, 1)
+                # Binding the socket to its port
+                sock.bind((host, port))
     except soc.error:
         # Outputting error message as socket binding failed
         print("*****************************")
         print("Binding sockets to ports failed, program will terminate")
         print("*****************************")
         sys.exit()
-    return[english_socket, maori_socket, german_socket]
+    record_sockets(sockets, ports)
+    return sockets
+
+
+def record_sockets(sockets, ports):
+    """
+    Records the language and time zone of each socket so they can be found
+    from its descriptor
+    :param sockets: The sockets, a group of one socket for each port on each address
+    :param ports: The port numbers in catalogue order
+    """
+    for index, sock in enumerate(sockets):
+        index %= len(ports)
+        socket_languages[sock.fileno()] = LANGUAGE_LIST[index].code
+        socket_zones[sock.fileno()] = port_zones[index] if index < len(port_zones) else 0
+
+
+def inherit_sockets(ports, addresses, path):
+    """
+    Takes over the sockets of a server running with the same --handoff path
+    :param ports: The port numbers in catalogue order
+    :param addresses: The addresses a group of sockets is opened on
+    :param path: The path of the running server's handoff socket
+    :return: A list of the sockets and the connection that is accepted once
+    the server is ready, None if no server is running
+    """
+    text = None
+    try:
+        taken = take_over(path)
+    except HandoffError as e:
+        taken, text = None, str(e)
+    if taken:
+        sockets, conn = taken
+        expected = [port for address in addresses for port in ports]
+        # Checking the sockets are bound to the ports this server was given
+        if len(sockets) != len(expected) or any(port and sock.getsockname()[1] != port
+                                                for sock, port in zip(sockets, expected)):
+            text = "Sockets of the running server don't match the ports given"
+            for sock in sockets:
+                sock.close()
+            conn.close()
+    if text:
+        print("*****************************")
+        print("{0}, program will terminate".format(text))
+        print("*****************************")
+        sys.exit()
+    if taken:
+        record_sockets(sockets, ports)
+    return taken
+
+
+def tune_sockets(sockets, options):
+    """
+    Sets the sizes of the sockets' buffers and asks the kernel to report
+    the datagrams it drops when a receive buffer is full
+    :param sockets: List holding the UDP sockets used by the server
+    :param options: A dictionary holding the value of every option
+    """
+    global track_drops
+    for option, name in ((soc.SO_RCVBUF, "--rcvbuf"), (soc.SO_SNDBUF, "--sndbuf")):
+        size = options[name]
+        if not size:
+            continue
+        try:
+            for sock in sockets:
+                sock.setsockopt(soc.SOL_SOCKET, option, size)
+        except (OSError, OverflowError, TypeError) as e:
+            # A size too big for a C int is taken as a buffer and raises TypeError
+            log.warning("Setting %s to %d bytes failed, the kernel's size is kept: %s", name, size, e)
+            continue
+        # Linux doubles the size asked for and caps it at rmem_max or wmem_max
+        actual = sockets[0].getsockopt(soc.SOL_SOCKET, option)
+        if actual < size:
+            log.warning("%s of %d bytes was capped at %d bytes by the kernel", name, size, actual)
+        else:
+            log.info("Socket %s set to %d bytes", name[2:], actual)
+    track_drops = False
+    if SO_RXQ_OVFL is not None:
+        try:
+            for sock in sockets:
+                sock.setsockopt(soc.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            track_drops = True
+        except OSError:
+            log.info("Kernel drop counts aren't available on this platform")
+
+
+def receive_batch(sock, buffers):
+    """
+    Reads up to one datagram into each of the preallocated buffers from a
+    socket that is ready to be read, stopping early once the socket is empty.
+    When the kernel reports drop counts they are read along with the datagrams.
+    :param sock: The socket to read the datagrams from
+    :param buffers: A list of (bytearray, memoryview) pairs to read into
+    :return: A list of (data, address) pairs, where data is a view of the buffer
+    """
+    packets = []
+    for buffer, view in buffers:
+        try:
+            if track_drops:
+                nbytes, ancdata, flags, address = sock.recvmsg_into([buffer], DROPS_ANCILLARY_SIZE)
+                # The count is only attached once the socket has dropped a datagram
+                for level, kind, value in ancdata:
+                    if level == soc.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                        fd = sock.fileno()
+                        stats.set_kernel_drops(socket_languages[fd], fd, DROPS_STRUCT.unpack(value)[0])
+            else:
+                nbytes, address = sock.recvfrom_into(buffer)
+        except BlockingIOError:
+            # No more datagrams are queued on the socket
+            break
+        packets.append((view[:nbytes], address))
+    return packets
+
+
+def send_batch(sock, responses):
+    """
+    Sends a group of response packets out of a socket
+    :param sock: The socket to send the responses from
+    :param responses: A list of (response, address) pairs
+    """
+    for response, address in responses:
+        try:
+            sock.sendto(response, address)
+        except BlockingIOError:
+            # The send buffer is full so the response is dropped, as UDP would
+            stats.send_errors += 1
+            log.warning("Send buffer full, response to %s dropped", address)
+            continue
+        except OSError as e:
+            stats.send_errors += 1
+            log.warning("Sending response to %s failed: %s", address, e)
+            continue
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Response packet sent to %s: %s", address, bytes(response))
+
+
+def answer_request(data, address, lang_code, zone=0):
+    """
+    Checks a received request packet and makes the response to it
+    :param data: The received packet
+    :param address: The address the packet was received from
+    :param lang_code: The language of the port the packet was received on
+    :param zone: The index of the time zone of the port
+    :return: The response packet to be sent, None if there is no response
+    """
+    started = time.perf_counter()
+    stats.received += 1
+    if limiter:
+        # Dropping requests over the rate limits before any other work is done
+        limit = limiter.check(address)
+        if limit:
+            stats.count_rate_limited(limit)
+            return None
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Request packet received from %s: %s", address, bytes(data))
+    if decode_packet(data) == 0:
+        # The received packet was valid
+        # A response packet is now made for the client
+        stats.valid += 1
+        if limiter and len(data) > REQUEST_LENGTH:
+            # A batch response is as large as a response to each of its
+            # entries, so the client is charged for every entry
+            limiter.charge(address, BATCH_STRUCT.unpack_from(data)[2] - 1)
+        if summary:
+            summary.add(lang_code)
+        response = handle_packet(data, lang_code, zone)
+        stats.processing.observe(time.perf_counter() - started)
+        return response
+    if summary:
+        summary.add_invalid()
+    return None
 
 
-def wait(sockets):
+def make_buffers(batch):
+    """
+    Allocates the buffers datagrams are read into
+    :param batch: The most datagrams that are read from a socket at once
+    :return: A list of (bytearray, memoryview) pairs, one for each datagram
+    """
+    buffers = []
+    for i in range(batch):
+        buffer = bytearray(BUFFER_SIZE)
+        buffers.append((buffer, memoryview(buffer)))
+    return buffers
+
+
+def wait(sockets, batch=1):
     """
     Server loops endlessly waiting for requests from the client
-    :param sockets: List holding the three UDP sockets used by the server
+    :param sockets: List holding the UDP sockets used by the server
+    :param batch: The most datagrams that are read from a socket each time
+    it is ready, the responses to them are then sent together
+    """
+    # Preallocating the receive buffers, these are reused by every batch
+    buffers = make_buffers(batch)
+    # Registering the sockets once, the selector is epoll on Linux so the
+    # sockets aren't passed to the kernel again on every loop
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ, (get_lang(sock, sockets), socket_zones[sock.fileno()]))
+    waker = open_waker()
+    if waker:
+        selector.register(waker[0], selectors.EVENT_READ, "signal")
+    if handoff_listener:
+        selector.register(handoff_listener, selectors.EVENT_READ, "handoff")
+    global reload_requested, stop_requested
+    try:
+        while not stop_requested:
+            for key, events in selector.select():
+                if key.data == "signal":
+                    # A signal was received, its flag is checked below
+                    clear_waker(waker)
+                elif key.data == "handoff":
+                    conn = offer_sockets(sockets)
+                    if conn:
+                        # No other server is let in until this one replies
+                        selector.unregister(handoff_listener)
+                        selector.register(conn.fileno(), selectors.EVENT_READ, "handoff reply")
+                elif key.data == "handoff reply":
+                    accepted = hand_over()
+                    if accepted is not None:
+                        selector.unregister(key.fd)
+                    if accepted:
+                        stop_requested = True
+                    elif accepted is not None:
+                        selector.register(handoff_listener, selectors.EVENT_READ, "handoff")
+                else:
+                    # A request has been received
+                    serve_socket(key.fileobj, key.data, buffers)
+            if reload_requested:
+                reload_requested = False
+                reload_config()
+                # Giving the sockets the languages they have in the new catalogue
+                for sock in sockets:
+                    selector.modify(sock, selectors.EVENT_READ,
+                                    (socket_languages[sock.fileno()], socket_zones[sock.fileno()]))
+        drain(sockets, buffers)
+    finally:
+        selector.close()
+        if waker:
+            close_waker(waker)
+
+
+def serve_socket(sock, port, buffers):
+    """
+    Answers the requests queued on a socket that is ready to be read
+    :param sock: The socket
+    :param port: The language code and time zone index of the socket
+    :param buffers: A list of (bytearray, memoryview) pairs to read into
+    :return: The number of requests read from the socket
+    """
+    lang_code, zone = port
+    responses = []
+    packets = receive_batch(sock, buffers)
+    for data, address in packets:
+        response = answer_request(data, address, lang_code, zone)
+        if capture:
+            capture.write(time.time(), lang_code, address, data, response)
+        if response:
+            responses.append((response, address))
+    # Sending the responses to every valid packet in the batch
+    send_batch(sock, responses)
+    return len(packets)
+
+
+def drain(sockets, buffers):
+    """
+    Answers the requests already queued on the sockets before the server
+    stops, giving up once DRAIN_TIMEOUT has passed
+    :param sockets: List holding the UDP sockets used by the server
+    :param buffers: A list of (bytearray, memoryview) pairs to read into
+    """
+    log.info("Answering queued requests before stopping")
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    busy = list(sockets)
+    while busy and time.monotonic() < deadline:
+        # Sockets are dropped from the list once they are empty
+        busy = [sock for sock in busy
+                if serve_socket(sock, (socket_languages[sock.fileno()], socket_zones[sock.fileno()]), buffers)]
+
+
+def open_waker():
+    """
+    Opens a socket pair that the signal module writes to when a signal is
+    received, so the selector wakes up to act on the signal
+    :return: The reading and writing sockets, None when not run in the main
+    thread as only the main thread receives signals
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    reader, writer = soc.socketpair()
+    reader.setblocking(False)
+    writer.setblocking(False)
+    signal.set_wakeup_fd(writer.fileno(), warn_on_full_buffer=False)
+    return reader, writer
+
+
+def clear_waker(waker):
+    """
+    Reads the bytes written to the waker so it can wake the selector again
+    :param waker: The sockets returned by open_waker()
+    """
+    try:
+        while waker[0].recv(64):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def close_waker(waker):
+    """
+    Stops signals being written to the waker and closes it
+    :param waker: The sockets returned by open_waker()
+    """
+    signal.set_wakeup_fd(-1)
+    for sock in waker:
+        sock.close()
+
+
+def request_stop(signum, frame):
+    """
+    Signal handler that makes the server answer its queued requests and stop
+    :param signum: The signal that was received
+    :param frame: The frame that was running when the signal was received
+    """
+    global stop_requested
+    stop_requested = True
+
+
+def request_reload(signum, frame):
     """
+    Signal handler that makes the server reload its configuration
+    :param signum: The signal that was received
+    :param frame: The frame that was running when the signal was received
+    """
+    global reload_requested
+    reload_requested = True
+
+
+def reload_config():
+    """
+    Reloads the language catalogue and time zones and reopens the capture
+    log, the sockets are kept open
+    """
+    global summary
+    log.info("Reloading configuration")
+    reload_languages(running_options["--languages"])
+    # Reading the zones again picks up any update to the time zone database
+    reload_zone_data()
+    ZONE_LIST[:] = [ZoneClock(zone.name, clock) for zone in ZONE_LIST]
+    response_cache.clear()
+    if summary:
+        summary = RequestSummary(running_options["--summary"])
+    if capture:
+        # Letting the capture log be rotated
+        capture.reopen()
+    log.info("Configuration reloaded")
+
+
+def reload_languages(path):
+    """
+    Loads the language catalogue again, a catalogue that can't be used is
+    logged and the old one is kept
+    :param path: The path of the catalogue file
+    """
+    try:
+        languages = load_catalogue(path)
+    except CatalogueError as e:
+        log.error("%s, the old catalogue is kept", e)
+        return
+    if len(languages) != len(LANGUAGE_LIST):
+        log.error("Catalogue has %d languages but %d ports are open, the old catalogue is kept",
+                  len(languages), len(LANGUAGE_LIST))
+        return
+    # Each socket keeps its position in the catalogue
+    positions = {language.code: index for index, language in enumerate(LANGUAGE_LIST)}
+    set_languages(languages)
+    for fd, lang_code in socket_languages.items():
+        socket_languages[fd] = languages[positions[lang_code]].code
+
+
+def offer_sockets(sockets):
+    """
+    Sends the sockets to a new server that has connected to the handoff
+    socket, requests are served as before until it replies
+    :param sockets: List holding the UDP sockets used by the server
+    :return: The connection the reply arrives on, None if nothing was sent
+    """
+    conn = handoff_listener.offer(sockets)
+    if conn:
+        log.info("Sockets sent to a new server, serving until it is ready")
+    return conn
+
+
+def hand_over():
+    """
+    Reads the reply of the new server the sockets were offered to
+    :return: True if the new server took them over, this server then stops,
+    False if it failed and None if it hasn't replied yet
+    """
+    global handed_over
+    accepted = handoff_listener.reply()
+    if accepted:
+        log.info("Sockets handed over to a new server")
+        handed_over = True
+    elif accepted is not None:
+        log.warning("New server failed to take the sockets over, still serving")
+    return accepted
+
+
+async def start_async_server(sockets):
+    """
+    Starts answering requests on the server's sockets from the running event
+    loop, this lets the server be hosted next to other asyncio services
+    :param sockets: List holding the UDP sockets used by the server
+    :return: A list of the datagram transports, closing them stops the server
+    """
+    # The engine is only imported when it is used as asyncio is slow to import
+    import aioengine
+    return await aioengine.start_async_server(sys.modules[__name__], sockets)
+
+
+async def serve_async(sockets):
+    """
+    Serves requests on the server's sockets until SIGTERM is received or the
+    task is cancelled
+    :param sockets: List holding the UDP sockets used by the server
+    """
+    import aioengine
+    await aioengine.serve_async(sys.modules[__name__], sockets)
+
+
+def wait_async(sockets):
+    """
+    Server runs an asyncio event loop answering requests from the client,
+    the loop is provided by uvloop when it is installed
+    :param sockets: List holding the UDP sockets used by the server
+    """
+    import aioengine
+    aioengine.wait_async(sys.modules[__name__], sockets)
+
+
+def start_limiter(options):
+    """
+    Creates the rate limiter if any rate limits were given
+    :param options: A dictionary holding the value of every option
+    """
+    global limiter
+    if options["--client-rate"] or options["--global-rate"]:
+        limiter = RateLimiter(options["--client-rate"], options["--client-burst"], options["--global-rate"],
+                              options["--max-clients"], options["--client-prefix"])
+    else:
+        limiter = None
+
+
+def start_stats(options, index, taken_over=False):
+    """
+    Starts the metrics endpoint and lets SIGUSR1 turn profiling on and off
+    :param options: A dictionary holding the value of every option
+    :param index: The index of the worker, 0 when there is one process
+    :param taken_over: Flag holding if the sockets were taken over from a
+    running server, which holds the stats port until it stops, the port is
+    then bound from a thread once it is free
+    """
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, ProfileToggle())
+    if not options["--stats-port"]:
+        return
+    port = options["--stats-port"] + index
+    if taken_over:
+        threading.Thread(target=retry_stats, args=(port,), daemon=True).start()
+        return
+    try:
+        start_endpoint(stats, port)
+    except OSError:
+        log.error("Binding stats endpoint to port %d failed, program will terminate", port)
+        sys.exit(1)
+    log.info("Serving metrics on http://127.0.0.1:%d/metrics", port)
+
+
+def retry_stats(port):
+    """
+    Binds the stats endpoint once the server that was replaced has freed the
+    port, the server keeps serving without metrics if it never does
+    :param port: The port the endpoint is bound to
+    """
+    deadline = time.monotonic() + HANDOFF_TIMEOUT + DRAIN_TIMEOUT
     while True:
-        reads, writes, exceps = select(sockets, [], [], 15.0)
-        if len(reads) != 0:
-            # A request has been received
-            for sock in reads:
-                # Buffer size is 1526 as this is the size of the biggest packet
-                # that can be sent over ethernet
-                data, address = sock.recvfrom(1526)
-                print("-----------------------------")
-                print("Request packet received from {0}: ".format(address))
-                print(data)
-                if decode_packet(data) == 0:
-                    # The received packet was valid
-                    # A response packet is now sent to the client
-                    lang_code = get_lang(sock, sockets)
-                    response = handle_packet(data, lang_code)
-                    if response:
-                        sock.sendto(response, address)
-                        print("Response packet sent to {0}: ".format(address))
-                        print(response)
-                        print("-----------------------------")
-                        print("-----------------------------")
+        try:
+            start_endpoint(stats, port)
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                log.error("Binding stats endpoint to port %d failed, metrics won't be served", port)
+                return
+            time.sleep(0.1)
+    log.info("Serving metrics on http://127.0.0.1:%d/metrics", port)
+
+
+def start_capture(options, index):
+    """
+    Opens the capture log if one was asked for
+    :param options: A dictionary holding the value of every option
+    :param index: The index of the worker, 0 when there is one process
+    """
+    global capture
+    if not options["--capture"]:
+        return
+    path = options["--capture"]
+    if options["--workers"] > 1:
+        # Each worker writes its own log as they can't share one file
+        path = "{0}.{1}".format(path, index)
+    try:
+        capture = CaptureWriter(path)
+    except OSError as e:
+        log.error("Opening capture log %s failed: %s, program will terminate", path, e)
+        sys.exit(1)
+    log.info("Capturing received datagrams to %s", path)
+
+
+def start_table(options):
+    """
+    Creates the shared response table if one was asked for and starts the
+    thread writing the packets of each minute into it, this is run by the
+    supervisor before the workers are forked so they share the table
+    :param options: A dictionary holding the value of every option
+    """
+    global response_table, publisher
+    if not options["--shared-table"]:
+        return
+    try:
+        response_table = ResponseTable(len(ZONE_LIST), len(LANGUAGE_LIST) * 2)
+        publish_minutes()
+    except Exception:
+        log.exception("Making the shared response table failed, workers will make their own packets")
+        stop_table()
+        return
+    publisher = threading.Thread(target=run_publisher, daemon=True)
+    publisher.start()
+    log.info("Sharing response packets with the workers")
+
+
+def publish_minutes():
+    """
+    Writes the packets of the current and the next minute into the shared
+    table, unless they are already there
+    :return: The number of the current minute since the epoch
+    """
+    number = int(clock.time() // 60)
+    for minute in (number, number + 1):
+        if response_table.written[minute % SLOTS] != minute:
+            publish_minute(minute)
+    return number
+
+
+def publish_minute(number):
+    """
+    Makes the packets of a minute and writes them into the shared table
+    :param number: The number of the minute since the epoch
+    """
+    # Reading each zone as it will be when the minute starts
+    minute_clock = FakeClock(number * 60)
+    minutes = [ZoneClock(zone.name, minute_clock).now() for zone in ZONE_LIST]
+    packets = {}
+    for zone, time in enumerate(minutes):
+        for lang_code in LANGUAGES:
+            for request_flag in (True, False):
+                packets[(zone, lang_code, request_flag)] = build_response(time, request_flag, lang_code)
+    response_table.write(number, minutes, packets)
+
+
+def run_publisher():
+    """
+    Runs in a thread of the supervisor, writing the packets of each minute
+    into the shared table a minute before they are needed. A reload of the
+    supervisor is done here too so the catalogue isn't changed while
+    packets are being made.
+    """
+    global reload_requested
+    while not table_stopping:
+        if reload_requested:
+            reload_requested = False
+            reload_config()
+            # Writing both minutes again with the new catalogue
+            response_table.written[:] = [None] * SLOTS
+        try:
+            number = publish_minutes()
+        except Exception:
+            log.exception("Writing the shared response table failed, workers will make their own packets")
+            number = int(clock.time() // 60)
+        # Waking once the current minute has ended and its slot can be reused
+        table_wakeup.wait(max(0.0, (number + 1) * 60 + PUBLISH_DELAY - clock.time()))
+        table_wakeup.clear()
+
+
+def stop_table():
+    """
+    Stops the thread writing the shared response table and then frees the table
+    """
+    global response_table, publisher, table_stopping
+    if publisher:
+        # Waiting for a write in progress so the memory isn't closed under it
+        table_stopping = True
+        table_wakeup.set()
+        publisher.join()
+        publisher = None
+    if response_table:
+        response_table.close()
+        response_table = None
+
+
+def stop_capture():
+    """
+    Writes the rest of the capture log and closes it
+    """
+    global capture
+    if capture:
+        capture.close()
+        capture = None
+
+
+def run_server(ports, options, reuse_port=False, index=0):
+    """
+    Opens the server's sockets and serves requests on them
+    :param ports: A list of the port numbers to bind
+    :param options: A dictionary holding the value of every option
+    :param reuse_port: Flag holding if the ports are shared with other workers
+    :param index: The index of the worker, 0 when there is one process
+    """
+    global running_options, handoff_listener
+    running_options = options
+    # Opening sockets, or taking them over from the server being replaced
+    addresses = process_bind(options["--bind"])
+    taken = None
+    if options["--handoff"]:
+        taken = inherit_sockets(ports, addresses, options["--handoff"])
+    if taken:
+        sockets, conn = taken
+    else:
+        sockets, conn = create_sockets(ports, reuse_port, addresses), None
+    try:
+        setup_logging(options)
+        if conn:
+            log.info("Took over %d sockets from the running server", len(sockets))
+        log.info("Listening on %s", ", ".join(address or "every address" for address in addresses))
+        start_stats(options, index, conn is not None)
+        tune_sockets(sockets, options)
+        start_limiter(options)
+        start_capture(options, index)
+        if options["--handoff"]:
+            handoff_listener = HandoffListener(options["--handoff"])
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, request_stop)
+            if hasattr(signal, "SIGHUP"):
+                signal.signal(signal.SIGHUP, request_reload)
+    except BaseException:
+        if conn:
+            # Closing the connection tells the old server to keep serving
+            conn.close()
+        raise
+    if startup_began is not None:
+        log.info("Ready in %.1f ms", (time.perf_counter() - startup_began) * 1000)
+    if conn:
+        # The old server stops reading once the new one is ready
+        accept(conn)
+    try:
+        if options["--engine"] == "asyncio":
+            # Running an event loop to wait for requests from the client
+            wait_async(sockets)
+        else:
+            # Entering a loop to wait for requests from the client
+            wait(sockets, options["--batch"])
+    finally:
+        stop_capture()
+        if handoff_listener:
+            # The path is left to a server that took the sockets over
+            handoff_listener.close(remove=not handed_over)
+            handoff_listener = None
+        # Closing all sockets
+        for sock in sockets:
+            sock.close()
+        log.info("Server stopped")
+
+
+def start_worker(ports, options, index):
+    """
+    Forks a worker process that binds its own sockets to the shared ports.
+    A forked child only keeps the thread that forked it, so any lock held
+    by another thread stays held in the child. The thread writing the log
+    is stopped while the process forks so it can't hold the lock of
+    stdout, and the worker sets up its logging again from scratch. The
+    supervisor's publisher thread only logs through the queue, whose locks
+    logging resets in the child, and the table it writes is only read there.
+    :param ports: A list of the port numbers to bind
+    :param options: A dictionary holding the value of every option
+    :param index: The index of the worker, used to give it its own stats port
+    :return: The process id of the worker
+    """
+    global startup_began, log_listener
+    listener = log_listener
+    if listener:
+        # Records logged meanwhile wait in the queue until it is restarted
+        listener.stop()
+    pid = os.fork()
+    if pid != 0:
+        if listener:
+            listener.start()
+        return pid
+    # Worker process, it must never return into supervise() as it would then
+    # run the supervisor's cleanup, stopping its siblings and freeing the table
+    startup_began = time.perf_counter()
+    code = 1
+    try:
+        # The supervisor's listener has no thread in this process
+        log_listener = None
+        setup_logging(options)
+        # The supervisor is left to handle interrupts, SIGTERM leaves the
+        # worker during startup and run_server() then drains on it
+        signal.signal(signal.SIGTERM, stop_process)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if hasattr(signal, "SIGUSR1"):
+            # Ignored until start_stats() installs the profiling toggle
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        run_server(ports, options, True, index)
+        code = 0
+    except SystemExit as e:
+        code = 1 if e.code else 0
+    except BaseException:
+        log.exception("Worker %d failed", os.getpid())
+    finally:
+        try:
+            stop_logging()
+        finally:
+            # Leaving without running any of the supervisor's cleanup
+            os._exit(code)
+
+
+def stop_process(signum, frame):
+    """
+    Signal handler that makes the supervisor or a worker leave its loop
+    :param signum: The signal that was received
+    :param frame: The frame that was running when the signal was received
+    """
+    sys.exit()
+
+
+def supervise(ports, options):
+    """
+    Runs the worker processes, restarting any that die until the
+    supervisor receives SIGTERM or SIGINT, the workers are then shut down
+    :param ports: A list of the port numbers to bind
+    :param options: A dictionary holding the value of every option
+    """
+    global running_options
+    running_options = options
+    # Checking the ports can be bound before any workers are started
+    for sock in create_sockets(ports, True, process_bind(options["--bind"])):
+        sock.close()
+    setup_logging(options)
+    start_table(options)
+    signal.signal(signal.SIGTERM, stop_process)
+    signal.signal(signal.SIGINT, stop_process)
+    # The index and start time of each worker keyed by its process id
+    workers = {}
+
+    def forward_reload(signum, frame):
+        global reload_requested
+        # Every worker reloads its own configuration
+        for pid in workers:
+            os.kill(pid, signal.SIGHUP)
+        if response_table:
+            # The supervisor reloads too as it makes the shared packets
+            reload_requested = True
+            table_wakeup.set()
+
+    def forward_profile(signum, frame):
+        # Every worker profiles itself, the supervisor serves no requests
+        for pid in workers:
+            os.kill(pid, signal.SIGUSR1)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, forward_reload)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, forward_profile)
+    try:
+        for index in range(options["--workers"]):
+            workers[start_worker(ports, options, index)] = (index, time.monotonic())
+        log.info("Started %d workers", len(workers))
+        while True:
+            pid, status = os.wait()
+            if pid not in workers:
+                continue
+            index, started = workers.pop(pid)
+            log.warning("Worker %d died, a new worker will be started", pid)
+            if time.monotonic() - started < 1.0:
+                # Waiting before restarting a worker that is failing on startup
+                time.sleep(1.0)
+            workers[start_worker(ports, options, index)] = (index, time.monotonic())
+    finally:
+        # Ignoring further stop signals so the cleanup can't be cut short,
+        # timeout and terminals signal the whole process group
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Shutting down every worker that is still running, a worker may
+        # already have been reaped by os.wait() as the signal arrived
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        log.info("All workers have been shut down")
+        stop_table()
+        stop_logging()
 
 
 def main():
     """
     Runs the server
     """
+    global startup_began
+    startup_began = IMPORT_BEGAN
     args = sys.argv[1:]
-    # Getting the three port numbers from the user
-    english_port, maori_port, german_port = process_ports(args)
-    # Opening sockets
-    sockets = create_sockets(english_port, maori_port, german_port)
-    # Entering a loop to wait for requests from the client
-    wait(sockets)
-    # Closing all sockets
-    for sock in sockets:
-        sock.close()
+    # Getting the options, languages and port numbers from the user
+    options, args = process_options(args)
+    load_languages(options["--languages"])
+    ports, zones = process_ports(args)
+    load_zones(options["--zones"], zones)
+    if options["--workers"] > 1:
+        # Sharing the ports between several worker processes
+        supervise(ports, options)
+    else:
+        try:
+            run_server(ports, options)
+        finally:
+            # Writing out the records logged as the server stopped
+            stop_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+##################################
+# COSC264 Sockets Assignment 2018 - conftest.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Lets the tests import the modules at the top of the repository
+##################################
+
+
+# Importing used modules
+import os
+import sys
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+##################################
+# End of conftest.py file
+##################################
@@ -0,0 +1,51 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_benchmark.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of the regression check of benchmark.py
+##################################
+
+
+# Importing used modules
+import json
+import sys
+import pytest
+import benchmark
+
+
+def test_compare_finds_regressions():
+    baseline = {"decode": 1.0, "encode": 2.0, "removed": 1.0}
+    results = {"decode": 1.2, "encode": 2.6, "added": 5.0}
+    assert benchmark.compare(results, baseline, 0.25) == ["encode"]
+    assert benchmark.compare(results, baseline, 0.1) == ["decode", "encode"]
+
+
+def test_compare_gate_exits_on_regression(tmp_path, monkeypatch, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"decode": 1.0, "encode": 1.0}))
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda: {"decode": 1.1, "encode": 3.0})
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--output", str(tmp_path / "results.json"),
+                                      "--compare", str(baseline)])
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark.main()
+    assert exit_info.value.code == 1
+    assert "encode" in capsys.readouterr().out
+    assert json.loads((tmp_path / "results.json").read_text()) == {"decode": 1.1, "encode": 3.0}
+
+
+def test_compare_gate_passes_without_regression(tmp_path, monkeypatch):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"decode": 1.0}))
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda: {"decode": 0.9})
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--output", str(tmp_path / "results.json"),
+                                      "--compare", str(baseline)])
+    benchmark.main()
+
+
+##################################
+# End of test_benchmark.py file
+##################################
@@ -0,0 +1,85 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_cache.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of cache_expiry() and the ResponseCache of client.py
+##################################
+
+
+# Importing used modules
+import pytest
+from client import DEFAULT_SKEW, ResponseCache, cache_expiry
+from clock import FakeClock
+from protocol import ENGLISH_CODE, TIME_REQUEST, pack_response, unpack_response
+
+
+# Half way through minute 1000 since the epoch, which is 40 minutes past the hour in UTC
+RECEIVED = 1000 * 60 + 30.0
+MINUTE_END = 1001 * 60.0
+SERVER = ("192.0.2.1", 5001)
+
+
+def make_response(minute):
+    return pack_response(ENGLISH_CODE, [2024, 1, 1, 12, minute], b"text")
+
+
+@pytest.mark.parametrize("minute, expires", [
+    # Same minute as the client, in UTC and in zones a whole 15 minutes away
+    (40, MINUTE_END), (55, MINUTE_END), (10, MINUTE_END),
+    # Server still in the minute before the client's, or already in the next
+    (39, MINUTE_END - 60), (54, MINUTE_END - 60), (41, MINUTE_END + 60),
+])
+def test_expiry(minute, expires):
+    assert cache_expiry(unpack_response(make_response(minute)), RECEIVED, skew=0) == expires
+
+
+def test_expiry_allows_for_skew():
+    response = unpack_response(make_response(40))
+    assert cache_expiry(response, RECEIVED, skew=2.0) == MINUTE_END - 2.0
+
+
+@pytest.mark.parametrize("minute", [42, 47, 52])
+def test_unplaceable_minute_expires_at_once(minute):
+    assert cache_expiry(unpack_response(make_response(minute)), RECEIVED) == RECEIVED
+
+
+def test_cache_keeps_response_until_minute_ends():
+    clock = FakeClock(RECEIVED)
+    cache = ResponseCache(skew=0, clock=clock)
+    pkt = make_response(40)
+    cache.put(SERVER, TIME_REQUEST, pkt)
+    assert cache.get(SERVER, TIME_REQUEST) == pkt
+    assert cache.get(("192.0.2.1", 5002), TIME_REQUEST) is None
+    clock.set(MINUTE_END)
+    assert cache.get(SERVER, TIME_REQUEST) is None
+
+
+def test_cache_skips_expired_response():
+    cache = ResponseCache(clock=FakeClock(MINUTE_END - DEFAULT_SKEW / 2))
+    cache.put(SERVER, TIME_REQUEST, make_response(40), received=RECEIVED)
+    assert cache.entries == {}
+
+
+def test_cache_file_is_shared(tmp_path):
+    path = str(tmp_path / "cache.json")
+    clock = FakeClock(RECEIVED)
+    pkt = make_response(40)
+    ResponseCache(path, skew=0, clock=clock).put(SERVER, TIME_REQUEST, pkt)
+    assert ResponseCache(path, skew=0, clock=clock).get(SERVER, TIME_REQUEST) == pkt
+
+
+def test_damaged_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text('{"192.0.2.1|5001|2": [1e12, "497e"]}')
+    assert ResponseCache(str(path), clock=FakeClock(RECEIVED)).get(SERVER, TIME_REQUEST) is None
+    path.write_text("not json")
+    assert ResponseCache(str(path), clock=FakeClock(RECEIVED)).get(SERVER, TIME_REQUEST) is None
+
+
+##################################
+# End of test_cache.py file
+##################################
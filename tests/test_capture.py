@@ -0,0 +1,92 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_capture.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of the capture files written and read by capture.py
+##################################
+
+
+# Importing used modules
+import pytest
+from capture import FILE_MAGIC, CaptureError, CaptureReader, CaptureWriter
+
+
+RECORDS = [
+    (1.5, 1, ("192.0.2.1", 1024), b"request", b"response"),
+    (2.25, 2, ("2001:db8::1", 65535), b"v6", None),
+    (3.0, 3, ("fe80::1%lo", 1), b"", b"x"),
+]
+
+
+def write_capture(path):
+    writer = CaptureWriter(str(path))
+    for record in RECORDS:
+        writer.write(*record)
+    writer.close()
+
+
+def test_records_are_read_back(tmp_path):
+    path = tmp_path / "capture.bin"
+    write_capture(path)
+    with CaptureReader(str(path)) as reader:
+        read = [(r.timestamp, r.lang_code, r.address, bytes(r.request), bytes(r.response)) for r in reader]
+    assert read == [
+        (1.5, 1, ("192.0.2.1", 1024), b"request", b"response"),
+        (2.25, 2, ("2001:db8::1", 65535), b"v6", b""),
+        (3.0, 3, ("fe80::1", 1), b"", b"x"),
+    ]
+
+
+def test_reopen_appends(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = CaptureWriter(str(path))
+    writer.write(*RECORDS[0])
+    writer.reopen()
+    writer.write(*RECORDS[1])
+    writer.close()
+    with CaptureReader(str(path)) as reader:
+        assert len(list(reader)) == 2
+
+
+def test_reopen_replaces_moved_file(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = CaptureWriter(str(path))
+    writer.write(*RECORDS[0])
+    path.rename(tmp_path / "old.bin")
+    writer.reopen()
+    writer.write(*RECORDS[1])
+    writer.close()
+    with CaptureReader(str(path)) as reader:
+        assert [r.lang_code for r in reader] == [2]
+
+
+def test_truncated_record_is_reported(tmp_path):
+    path = tmp_path / "capture.bin"
+    write_capture(path)
+    data = path.read_bytes()
+    for length in [len(data) - 1, len(FILE_MAGIC) + 3]:
+        path.write_bytes(data[:length])
+        with CaptureReader(str(path)) as reader:
+            with pytest.raises(CaptureError):
+                list(reader)
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(CaptureError):
+        CaptureReader(str(path))
+    with pytest.raises(CaptureError):
+        CaptureReader(str(tmp_path / "missing.bin"))
+    path.write_bytes(b"")
+    with pytest.raises(CaptureError):
+        CaptureReader(str(path))
+
+
+##################################
+# End of test_capture.py file
+##################################
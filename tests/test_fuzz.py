@@ -0,0 +1,69 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_fuzz.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Runs the packets made by fuzz.py through the server's and client's
+# validators, skipped when Hypothesis isn't installed
+##################################
+
+
+# Importing used modules
+import pytest
+hypothesis = pytest.importorskip("hypothesis")
+import client
+import fuzz
+import server
+from protocol import DATE_REQUEST, TIME_REQUEST, ENGLISH_CODE, pack_request
+
+
+fuzz.setup_server()
+SEEDS = fuzz.make_seeds()
+SETTINGS = hypothesis.settings(max_examples=500, deadline=None, database=None,
+                               suppress_health_check=list(hypothesis.HealthCheck))
+
+
+def new_counts():
+    return dict.fromkeys(["packets", "server_accepted", "client_accepted"], 0)
+
+
+@SETTINGS
+@hypothesis.given(fuzz.packet_strategy(SEEDS))
+def test_validators_never_fail(pkt):
+    # check_packet() raises FuzzError if either validator raises, or accepts
+    # a packet that can't then be answered or read
+    fuzz.check_packet(pkt, new_counts())
+
+
+@SETTINGS
+@hypothesis.given(hypothesis.strategies.binary(max_size=fuzz.MAX_PACKET))
+def test_random_bytes_are_rejected_without_counting_as_valid(pkt):
+    before = server.stats.valid
+    result = server.answer_request(memoryview(bytearray(pkt)), ("192.0.2.1", 1024), ENGLISH_CODE)
+    if result is None:
+        assert server.stats.valid == before
+    else:
+        assert client.check_packet(result) is None
+
+
+def test_seeds_are_accepted():
+    counts = new_counts()
+    for pkt in SEEDS:
+        fuzz.check_packet(pkt, counts)
+    # Every request seed is answered and every response seed is read
+    assert counts["server_accepted"] == counts["client_accepted"] == len(SEEDS) // 2
+
+
+@pytest.mark.parametrize("request_type", [DATE_REQUEST, TIME_REQUEST])
+def test_truncated_requests_are_rejected(request_type):
+    pkt = pack_request(request_type)
+    for length in range(len(pkt)):
+        assert server.decode_packet(memoryview(bytearray(pkt[:length]))) == 1
+
+
+##################################
+# End of test_fuzz.py file
+##################################
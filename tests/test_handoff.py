@@ -0,0 +1,131 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_handoff.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of passing sockets between servers with handoff.py
+##################################
+
+
+# Importing used modules
+import socket as soc
+import threading
+import time
+import pytest
+from handoff import HandoffError, HandoffListener, accept, take_over
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "handoff.sock")
+
+
+def start_take_over(path):
+    """
+    Runs take_over() in a thread, as it waits for the listener to send the sockets
+    """
+    result = {}
+
+    def run():
+        try:
+            result["value"] = take_over(path)
+        except HandoffError as e:
+            result["error"] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, result
+
+
+def wait_for_offer(listener, sockets):
+    for attempt in range(500):
+        conn = listener.offer(sockets)
+        if conn:
+            return conn
+        time.sleep(0.01)
+    raise AssertionError("New server didn't connect")
+
+
+def wait_for_reply(listener):
+    for attempt in range(500):
+        accepted = listener.reply()
+        if accepted is not None:
+            return accepted
+        time.sleep(0.01)
+    raise AssertionError("New server didn't reply")
+
+
+def test_no_server_listening(path):
+    assert take_over(path) is None
+
+
+def test_offer_without_new_server(path):
+    listener = HandoffListener(path)
+    sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    assert listener.offer([sock]) is None
+    sock.close()
+    listener.close()
+
+
+def test_sockets_are_handed_over(path):
+    listener = HandoffListener(path)
+    sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    thread, result = start_take_over(path)
+    wait_for_offer(listener, [sock])
+    thread.join()
+    sockets, conn = result["value"]
+    assert [s.getsockname() for s in sockets] == [sock.getsockname()]
+    assert listener.reply() is None
+    accept(conn)
+    assert wait_for_reply(listener) is True
+    assert listener.conn is None
+    # The new server owns the path once it has taken over
+    listener.close(remove=False)
+    for s in sockets + [sock]:
+        s.close()
+
+
+def test_failed_new_server(path):
+    listener = HandoffListener(path)
+    sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    thread, result = start_take_over(path)
+    wait_for_offer(listener, [sock])
+    thread.join()
+    sockets, conn = result["value"]
+    # A new server that fails to start closes the connection without replying
+    conn.close()
+    assert wait_for_reply(listener) is False
+    for s in sockets + [sock]:
+        s.close()
+    listener.close()
+
+
+def test_server_that_sends_no_sockets(path):
+    listener = soc.socket(soc.AF_UNIX, soc.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+    thread, result = start_take_over(path)
+    conn, unused = listener.accept()
+    conn.close()
+    thread.join()
+    assert isinstance(result["error"], HandoffError)
+    listener.close()
+
+
+def test_close_removes_only_own_path(path):
+    old = HandoffListener(path)
+    new = HandoffListener(path)
+    old.close()
+    client = soc.socket(soc.AF_UNIX, soc.SOCK_STREAM)
+    assert client.connect_ex(path) == 0
+    client.close()
+    new.close()
+    assert take_over(path) is None
+
+
+##################################
+# End of test_handoff.py file
+##################################
@@ -0,0 +1,97 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_ratelimit.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of the token buckets in ratelimit.py
+##################################
+
+
+# Importing used modules
+import pytest
+import ratelimit
+from ratelimit import RateLimiter
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """
+    Stops the clock the limiter reads, the test moves it by changing now[0]
+    """
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_client_burst_then_refill(now):
+    limiter = RateLimiter(client_rate=2, client_burst=3, global_rate=0, max_clients=10)
+    address = ("192.0.2.1", 1024)
+    assert [limiter.check(address) for i in range(4)] == [None, None, None, "client"]
+    now[0] += 0.5
+    assert limiter.check(address) is None
+    assert limiter.check(address) == "client"
+
+
+def test_refill_is_capped_at_burst(now):
+    limiter = RateLimiter(client_rate=10, client_burst=2, global_rate=0, max_clients=10)
+    address = ("192.0.2.1", 1024)
+    now[0] += 60
+    assert [limiter.check(address) for i in range(3)] == [None, None, "client"]
+
+
+def test_clients_in_one_subnet_share_a_bucket(now):
+    limiter = RateLimiter(client_rate=1, client_burst=1, global_rate=0, max_clients=10, prefix_v4=24)
+    assert limiter.check(("192.0.2.1", 1024)) is None
+    assert limiter.check(("192.0.2.200", 1024)) == "client"
+    assert limiter.check(("198.51.100.1", 1024)) is None
+    # A mapped IPv4 address of a dual-stack socket is grouped as IPv4
+    assert limiter.check(("::ffff:192.0.2.9", 1024, 0, 0)) == "client"
+
+
+def test_ipv6_prefix(now):
+    limiter = RateLimiter(client_rate=1, client_burst=1, global_rate=0, max_clients=10)
+    assert limiter.check(("2001:db8::1", 1024, 0, 0)) is None
+    assert limiter.check(("2001:db8::ffff", 1024, 0, 0)) == "client"
+    assert limiter.check(("2001:db8:0:1::1", 1024, 0, 0)) is None
+
+
+def test_global_limit(now):
+    limiter = RateLimiter(client_rate=0, client_burst=1, global_rate=2, max_clients=10)
+    results = [limiter.check(("192.0.2.{0}".format(i), 1024)) for i in range(3)]
+    assert results == [None, None, "global"]
+
+
+def test_idle_client_is_evicted_first(now):
+    limiter = RateLimiter(client_rate=1, client_burst=1, global_rate=0, max_clients=2)
+    first, second, third = ("192.0.2.1", 1), ("192.0.2.2", 1), ("192.0.2.3", 1)
+    limiter.check(first)
+    limiter.check(second)
+    # Using the first client again leaves the second as the idlest
+    assert limiter.check(first) == "client"
+    limiter.check(third)
+    assert len(limiter.buckets) == 2
+    assert limiter.check(first) == "client"
+    # The second client's bucket was evicted, so it starts full again
+    assert limiter.check(second) is None
+
+
+def test_charge_takes_extra_tokens(now):
+    limiter = RateLimiter(client_rate=10, client_burst=5, global_rate=100, max_clients=10)
+    address = ("192.0.2.1", 1024)
+    assert limiter.check(address) is None
+    limiter.charge(address, 9)
+    assert limiter.global_bucket.tokens == 100 - 1 - 9
+    # The bucket is now at -5, so it takes 0.6 seconds to refill to a token
+    assert limiter.check(address) == "client"
+    now[0] += 0.5
+    assert limiter.check(address) == "client"
+    now[0] += 0.15
+    assert limiter.check(address) is None
+
+
+##################################
+# End of test_ratelimit.py file
+##################################
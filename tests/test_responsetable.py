@@ -0,0 +1,99 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_responsetable.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of the sequence locked slots of responsetable.py
+##################################
+
+
+# Importing used modules
+import pytest
+from protocol import ENGLISH_CODE, MAORI_CODE, pack_response
+from responsetable import SLOTS, ResponseTable
+
+
+MINUTES = [(2024, 1, 1, 12, 0), (2024, 1, 1, 13, 0)]
+
+
+def make_packets(minutes):
+    packets = {}
+    for zone, minute in enumerate(minutes):
+        for lang_code in [ENGLISH_CODE, MAORI_CODE]:
+            for request_flag in [True, False]:
+                packets[(zone, lang_code, request_flag)] = \
+                    pack_response(lang_code, minute, "{0} {1}".format(zone, request_flag).encode())
+    return packets
+
+
+@pytest.fixture
+def table():
+    table = ResponseTable(len(MINUTES), 4)
+    yield table
+    table.close()
+
+
+def test_lookup_finds_written_packet(table):
+    packets = make_packets(MINUTES)
+    table.write(7, MINUTES, packets)
+    for (zone, lang_code, request_flag), packet in packets.items():
+        assert table.lookup(MINUTES[zone], zone, lang_code, request_flag) == packet
+    # A minute that hasn't been written isn't found
+    assert table.lookup((2024, 1, 1, 12, 1), 0, ENGLISH_CODE, True) is None
+
+
+def test_both_slots_are_kept(table):
+    later = [minute[:4] + (1,) for minute in MINUTES]
+    table.write(0, MINUTES, make_packets(MINUTES))
+    table.write(1, later, make_packets(later))
+    assert table.lookup(MINUTES[1], 1, ENGLISH_CODE, False) is not None
+    assert table.lookup(later[1], 1, ENGLISH_CODE, False) is not None
+
+
+def test_packet_that_couldnt_be_made(table):
+    packets = make_packets(MINUTES)
+    packets[(0, ENGLISH_CODE, True)] = None
+    table.write(0, MINUTES, packets)
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is None
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, False) is not None
+
+
+def test_slot_being_written_is_skipped(table):
+    table.write(0, MINUTES, make_packets(MINUTES))
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is not None
+    # An odd sequence number marks the slot as part way through a write
+    table.sequence_views[0][0] += 1
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is None
+    table.sequence_views[0][0] += 1
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is not None
+
+
+def test_rewritten_slot_is_read_again(table):
+    table.write(0, MINUTES, make_packets(MINUTES))
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is not None
+    later = [minute[:4] + (2,) for minute in MINUTES]
+    table.write(SLOTS, later, make_packets(later))
+    assert table.lookup(MINUTES[0], 0, ENGLISH_CODE, True) is None
+    assert table.lookup(later[0], 0, ENGLISH_CODE, True) is not None
+
+
+def test_close_releases_held_views():
+    table = ResponseTable(len(MINUTES), 4)
+    table.write(0, MINUTES, make_packets(MINUTES))
+    view = table.lookup(MINUTES[0], 0, ENGLISH_CODE, True)
+    table.close()
+    with pytest.raises(ValueError):
+        bytes(view)
+
+
+def test_oversized_table_is_refused():
+    with pytest.raises(ValueError):
+        ResponseTable(0xFFFF, 0xFFFF)
+
+
+##################################
+# End of test_responsetable.py file
+##################################
@@ -0,0 +1,68 @@
+##################################
+# COSC264 Sockets Assignment 2018 - test_timezones.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Unit tests of the cached offsets and minutes of timezones.py
+##################################
+
+
+# Importing used modules
+import pytest
+from clock import FakeClock
+from timezones import TRANSITION_STEP, ZoneClock, ZoneError
+
+
+# New Zealand daylight time ended at 14:00 UTC on 6 April 2024, the clocks
+# went back from 03:00 NZDT to 02:00 NZST
+DST_END = 1712412000.0
+
+
+def test_offset_changes_at_dst_end():
+    clock = FakeClock(DST_END - 60)
+    zone = ZoneClock("Pacific/Auckland", clock)
+    assert zone.now() == (2024, 4, 7, 2, 59)
+    assert zone.offset == 13 * 3600
+    clock.advance(60)
+    assert zone.now() == (2024, 4, 7, 2, 0)
+    assert zone.offset == 12 * 3600
+
+
+def test_clock_stepped_back_over_dst_end():
+    clock = FakeClock(DST_END + 30)
+    zone = ZoneClock("Pacific/Auckland", clock)
+    assert zone.now() == (2024, 4, 7, 2, 0)
+    clock.set(DST_END - 30)
+    assert zone.now() == (2024, 4, 7, 2, 59)
+    assert zone.offset == 13 * 3600
+
+
+def test_minute_is_cached_within_minute():
+    clock = FakeClock(DST_END)
+    zone = ZoneClock("UTC", clock)
+    minute = zone.now()
+    clock.advance(59.5)
+    assert zone.now() is minute
+    clock.advance(0.5)
+    assert zone.now() == (2024, 4, 6, 14, 1)
+
+
+def test_offset_is_cached_until_transition_step():
+    zone = ZoneClock("Asia/Kolkata", FakeClock(DST_END))
+    zone.now()
+    assert zone.valid_from == DST_END
+    assert zone.valid_until == DST_END + TRANSITION_STEP
+    assert zone.now() == (2024, 4, 6, 19, 30)
+
+
+def test_unknown_zone():
+    with pytest.raises(ZoneError):
+        ZoneClock("Nowhere/Atlantis")
+
+
+##################################
+# End of test_timezones.py file
+##################################
@@ -0,0 +1,110 @@
+##################################
+# COSC264 Sockets Assignment 2018 - timezones.py
+# Author: Ambrose Ledbrook
+# ID: 79172462
+##################################
+
+
+##################################
+# Time zones that server.py can make responses in
+##################################
+
+
+# Importing used modules
+import datetime
+import time
+import zoneinfo
+from clock import SYSTEM_CLOCK
+
+
+# Offsets only change at a whole multiple of this many seconds past the
+# hour in UTC, so a zone's offset is cached until the next such boundary
+TRANSITION_STEP = 900
+
+
+class ZoneError(Exception):
+    """
+    Raised when a time zone can't be found
+    """
+
+
+class ZoneClock:
+    """
+    Gives the current date and time in a time zone. The UTC offset of the
+    zone is cached so it is only worked out when it may have changed, and
+    the date and time are published as one tuple for the whole minute.
+    """
+    __slots__ = ("name", "zone", "clock", "offset", "valid_from", "valid_until",
+                 "minute", "minute_from", "minute_until")
+
+    def __init__(self, name=None, clock=SYSTEM_CLOCK):
+        """
+        Creates a clock for a time zone
+        :param name: The IANA name of the zone, None for the host's own zone
+        :param clock: The clock the time is read from, a FakeClock in tests
+        """
+        self.name = name
+        self.clock = clock
+        if name is None:
+            self.zone = None
+        else:
+            try:
+                self.zone = zoneinfo.ZoneInfo(name)
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                raise ZoneError("Time zone {0} can't be found".format(name))
+        self.offset = 0
+        self.valid_from = 0.0
+        self.valid_until = 0.0
+        self.minute = None
+        self.minute_from = 0.0
+        self.minute_until = 0.0
+
+    def utc_offset(self, now):
+        """
+        Gets the UTC offset of the zone, working it out again only once the
+        cached offset may have changed or the clock has been stepped back
+        :param now: The current wall clock time
+        :return: The offset in seconds
+        """
+        if not self.valid_from <= now < self.valid_until:
+            utc = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+            if self.zone is None:
+                local = utc.astimezone()
+            else:
+                local = utc.astimezone(self.zone)
+            self.offset = int(local.utcoffset().total_seconds())
+            self.valid_from = now - now % TRANSITION_STEP
+            self.valid_until = self.valid_from + TRANSITION_STEP
+        return self.offset
+
+    def now(self):
+        """
+        Gets the current date and time in the zone. The tuple is only made
+        again once the wall clock leaves the minute it was made for, checking
+        both ends of the minute keeps it right when the clock is stepped
+        forwards or back.
+        :return: A tuple holding the year, month, day, hour and minute
+        """
+        now = self.clock.time()
+        if self.minute_from <= now < self.minute_until:
+            return self.minute
+        offset = self.utc_offset(now)
+        local = now + offset
+        self.minute = time.gmtime(local)[:5]
+        # Offsets only change on a minute boundary so the minute is the same in UTC
+        self.minute_from = local - local % 60 - offset
+        self.minute_until = self.minute_from + 60
+        return self.minute
+
+
+def reload_zone_data():
+    """
+    Forgets the zone data read so far, so an updated time zone database is
+    read the next time a zone is loaded
+    """
+    zoneinfo.ZoneInfo.clear_cache()
+
+
+##################################
+# End of timezones.py file
+##################################